@@ -4,13 +4,31 @@
 complex_vector.py
 实现复数类、无序向量及其置乱、查找、插入、删除、唯一化；
 支持按模+实部起泡/归并排序并计时对比；
-支持已序向量区间查询 [m1,m2)。
+支持已序向量区间查询 [m1,m2)：已序时二分定位并直接返回切片，插入/删除增量维持有序。
+可选的 值->下标 哈希索引使查找期望 O(1)，并支持增量唯一化。
+另提供基于 numpy 的列式存储 ColumnarComplexVector（实部/虚部/模长三列连续数组）。
+可插拔排序引擎 SORT_ENGINES（就地自底向上归并/Timsort 式/预计算键），bench_sort 输出 CSV。
+排序的比较/交换/移动次数计入 instrument.PROBE（exp1.sort.*），开启插桩时 bench_sort 一并写入 CSV。
 """
 import random
 import math
+import csv
+import os
+import sys
 import time
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
 from typing import List, Optional
 
+try:
+    import numpy as np
+except ImportError:     # 列式存储为可选功能，无 numpy 时仅提供列表版
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from instrument import PROBE
+
 class Complex:
     __slots__ = ("re", "im")
     def __init__(self, re: float, im: float):
@@ -25,21 +43,334 @@ class Complex:
     def __repr__(self):
         return f"({self.re}{self.im:+.1f}j)"
 
+def _mod_key(c: Complex) -> float:
+    return c.mod
+
+# ---------- 排序引擎：先预计算 (模, 实部) 键，再对下标排列排序 ----------
+_MIN_MERGE = 32
+
+def _sort_keys(a: List[Complex]) -> list:
+    keys = [(math.hypot(c.re, c.im), c.re) for c in a]
+    if PROBE.enabled:   # 开启插桩时包装键，连同内建 sorted 中的比较一起计数
+        K = PROBE.counting("exp1.sort.compare")
+        keys = [K(k) for k in keys]
+    return keys
+
+def _merge_runs(p: List[int], keys: list, lo: int, mid: int, hi: int, buf: List[int]):
+    # 归并已序段 p[lo:mid] 与 p[mid:hi]：仅左段拷入复用缓冲区，相等取左保持稳定
+    if not keys[p[mid]] < keys[p[mid - 1]]:
+        return
+    m = mid - lo
+    if len(buf) < m:
+        buf.extend([0] * (m - len(buf)))
+    buf[:m] = p[lo:mid]
+    i, j, k = 0, mid, lo
+    while i < m and j < hi:
+        if keys[p[j]] < keys[buf[i]]:
+            p[k] = p[j]; j += 1
+        else:
+            p[k] = buf[i]; i += 1
+        k += 1
+    if i < m:
+        p[k:k + m - i] = buf[i:m]
+    if PROBE.enabled:   # 左段拷入缓冲 m 次，回写 p[lo:j]；右段剩余部分已在原位
+        PROBE.add("exp1.sort.move", m + j - lo)
+
+def _merge_cols(a: list, mods: array, res: array, lo: int, mid: int, hi: int, buf: tuple):
+    # 就地归并 a[lo:mid] 与 a[mid:hi]，键列 mods/res 随 a 同步移动；
+    # 只把较短的一段拷入缓冲区：左段短时从前往后归并，右段短时从后往前，相等时左段在前保持稳定
+    ma, mb = mods[mid], mods[mid - 1]
+    if ma > mb or (ma == mb and not res[mid] < res[mid - 1]):
+        if PROBE.enabled:
+            PROBE.add("exp1.sort.compare")
+        return
+    ba, bm, br = buf
+    if mid - lo <= hi - mid:
+        m = mid - lo
+        ba[:m] = a[lo:mid]; bm[:m] = mods[lo:mid]; br[:m] = res[lo:mid]
+        i, j, k = 0, mid, lo
+        while i < m and j < hi:
+            mj, mi = mods[j], bm[i]
+            if mj < mi or (mj == mi and res[j] < br[i]):
+                a[k] = a[j]; mods[k] = mj; res[k] = res[j]; j += 1
+            else:
+                a[k] = ba[i]; mods[k] = mi; res[k] = br[i]; i += 1
+            k += 1
+        if i < m:
+            a[k:hi] = ba[i:m]; mods[k:hi] = bm[i:m]; res[k:hi] = br[i:m]
+        if PROBE.enabled:   # 每轮一次比较；拷入缓冲 m 次，回写 a[lo:j]，右段剩余部分已在原位
+            PROBE.add("exp1.sort.compare", i + j - mid + 1)
+            PROBE.add("exp1.sort.move", m + j - lo)
+    else:
+        m = hi - mid
+        ba[:m] = a[mid:hi]; bm[:m] = mods[mid:hi]; br[:m] = res[mid:hi]
+        i, j, k = m - 1, mid - 1, hi - 1
+        while i >= 0 and j >= lo:
+            mi, mj = bm[i], mods[j]
+            if mi < mj or (mi == mj and br[i] < res[j]):
+                a[k] = a[j]; mods[k] = mj; res[k] = res[j]; j -= 1
+            else:
+                a[k] = ba[i]; mods[k] = mi; res[k] = br[i]; i -= 1
+            k -= 1
+        if i >= 0:
+            a[lo:k + 1] = ba[:i + 1]; mods[lo:k + 1] = bm[:i + 1]; res[lo:k + 1] = br[:i + 1]
+        if PROBE.enabled:   # 左段剩余部分已在原位
+            PROBE.add("exp1.sort.compare", m - i + mid - j - 1)
+            PROBE.add("exp1.sort.move", m + hi - 1 - j)
+
+def _merge_bu_inplace(a: list):
+    # 自底向上归并：键存放在两列 array('d')（模、实部）中与 a 一起置换，
+    # 不生成键元组与下标排列，额外空间只有一份至多 n/2 的缓冲区
+    n = len(a)
+    mods = array('d', (math.hypot(c.re, c.im) for c in a))
+    res = array('d', (c.re for c in a))
+    half = n // 2
+    buf = ([None] * half, array('d', [0.0]) * half, array('d', [0.0]) * half)
+    width = 1
+    while width < n:
+        for lo in range(0, n - width, 2 * width):
+            _merge_cols(a, mods, res, lo, lo + width, min(lo + 2 * width, n), buf)
+        width *= 2
+
+def _min_run(n: int) -> int:
+    r = 0
+    while n >= _MIN_MERGE:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+def _binary_insertion(p: List[int], keys: list, lo: int, start: int, end: int):
+    on, moves = PROBE.enabled, 0
+    for i in range(start, end):
+        x = p[i]; kx = keys[x]
+        l, r = lo, i
+        while l < r:
+            m = (l + r) // 2
+            if kx < keys[p[m]]: r = m
+            else: l = m + 1
+        p[l + 1:i + 1] = p[l:i]
+        p[l] = x
+        if on:
+            moves += i - l
+    if on:
+        PROBE.add("exp1.sort.move", moves)
+
+def _timsort_perm(keys: list) -> List[int]:
+    n = len(keys)
+    p, buf, runs = list(range(n)), [], []     # runs: (起点, 长度) 栈
+    minrun = _min_run(n)
+
+    def collapse(force: bool):
+        # 维持 Timsort 栈不变式 |A| > |B|+|C|, |B| > |C|
+        while len(runs) > 1:
+            k = len(runs) - 2
+            if force:
+                if k > 0 and runs[k - 1][1] < runs[k + 1][1]: k -= 1
+            elif ((k > 0 and runs[k - 1][1] <= runs[k][1] + runs[k + 1][1]) or
+                  (k > 1 and runs[k - 2][1] <= runs[k - 1][1] + runs[k][1])):
+                if runs[k - 1][1] < runs[k + 1][1]: k -= 1
+            elif runs[k][1] > runs[k + 1][1]:
+                break
+            (s1, l1), (s2, l2) = runs[k], runs[k + 1]
+            _merge_runs(p, keys, s1, s2, s2 + l2, buf)
+            runs[k] = (s1, l1 + l2)
+            del runs[k + 1]
+
+    lo = 0
+    while lo < n:
+        hi = lo + 1
+        if hi < n:
+            if keys[p[hi]] < keys[p[lo]]:      # 严格降序段原地反转
+                while hi + 1 < n and keys[p[hi + 1]] < keys[p[hi]]: hi += 1
+                p[lo:hi + 1] = p[lo:hi + 1][::-1]
+            else:
+                while hi + 1 < n and not keys[p[hi + 1]] < keys[p[hi]]: hi += 1
+            hi += 1
+        end = min(n, lo + minrun)
+        if hi < end:                            # 短段用二分插入补足 minrun
+            _binary_insertion(p, keys, lo, hi, end)
+            hi = end
+        runs.append((lo, hi - lo))
+        collapse(False)
+        lo = hi
+    collapse(True)
+    return p
+
+def _decorate_perm(keys: list) -> List[int]:
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+class _SlotIndex:
+    # 值 -> 下标 索引，任意位置插入/删除后仍以 O(log n) 给出首次出现的下标。
+    # 建立时第 i 个元素占槽 i；之后插在中间的元素挂到间隙 g（槽 g 之前）的列表里，删除只把槽标记为失效，
+    # 尾部追加新开一个槽。树状数组按格累计（间隙 g 的元素数 + 槽 g 是否存活），前缀和即为当前下标。
+    # edits 统计间隙插入与删除次数，由调用方在其超过元素数一半时重建，使间隙与失效槽的规模有界。
+    __slots__ = ("slots", "alive", "gaps", "added", "tree", "edits")
+    def __init__(self, data: List[Complex]):
+        n = len(data)
+        slots = {}
+        for i, c in enumerate(data):
+            slots.setdefault((c.re, c.im), []).append(i)
+        self.slots = slots              # (re, im) -> 升序槽号，可含失效槽（查找时从头部剔除）
+        self.alive = bytearray(b'\x01') * n
+        self.gaps = {}                  # g -> 插在槽 g 之前的元素；g == 槽数 时为末尾
+        self.added = {}                 # (re, im) -> {g: 间隙 g 中该值的个数}
+        self.edits = 0
+        tree = [1] * (n + 2)            # 树状数组（1 起），格 g 存于 tree[g + 1]；末尾格初值为 0
+        tree[0] = tree[n + 1] = 0
+        for i in range(1, n + 2):
+            j = i + (i & -i)
+            if j <= n + 1:
+                tree[j] += tree[i]
+        self.tree = tree
+    def _add(self, g: int, d: int):
+        tree = self.tree
+        g += 1
+        while g < len(tree):
+            tree[g] += d
+            g += g & -g
+    def _before(self, g: int) -> int:
+        # 格 0..g-1 中的元素个数
+        s, tree = 0, self.tree
+        while g:
+            s += tree[g]
+            g &= g - 1
+        return s
+    def _locate(self, q: int):
+        # 当前下标 q -> (格 g, 格内偏移 r)：r < len(gaps[g]) 为间隙元素，否则为槽 g 本身
+        tree = self.tree
+        g, step = 0, 1 << (len(tree) - 1).bit_length()
+        while step:
+            k = g + step
+            if k < len(tree) and tree[k] <= q:
+                g = k
+                q -= tree[k]
+            step >>= 1
+        return g, q
+    def insert(self, q: int, c: Complex, n: int):
+        key = (c.re, c.im)
+        if q == n:                      # 尾部追加：末尾格成为新槽，再接一个空的末尾格
+            m = len(self.alive)
+            self.slots.setdefault(key, []).append(m)
+            self.alive.append(1)
+            self._add(m, 1)
+            i = len(self.tree)
+            self.tree.append(self._before(i - 1) - self._before(i - (i & -i)))
+            return
+        g, r = self._locate(q)
+        self.gaps.setdefault(g, []).insert(r, c)
+        cnt = self.added.setdefault(key, {})
+        cnt[g] = cnt.get(g, 0) + 1
+        self._add(g, 1)
+        self.edits += 1
+    def remove(self, q: int):
+        g, r = self._locate(q)
+        gap = self.gaps.get(g)
+        if gap and r < len(gap):
+            c = gap.pop(r)
+            if not gap:
+                del self.gaps[g]
+            key = (c.re, c.im)
+            cnt = self.added[key]
+            cnt[g] -= 1
+            if not cnt[g]:
+                del cnt[g]
+                if not cnt:
+                    del self.added[key]
+        else:
+            self.alive[g] = 0
+        self._add(g, -1)
+        self.edits += 1
+    def find(self, c: Complex) -> int:
+        key = (c.re, c.im)
+        s, lst = -1, self.slots.get(key)
+        if lst:
+            alive, k = self.alive, 0
+            while k < len(lst) and not alive[lst[k]]:
+                k += 1
+            if k:
+                del lst[:k]
+            if lst:
+                s = lst[0]
+            else:
+                del self.slots[key]
+        cnt = self.added.get(key)
+        if cnt:
+            g = min(cnt)
+            if s < 0 or g <= s:         # 间隙 g 位于槽 g 之前
+                return self._before(g) + self.gaps[g].index(c)
+        return -1 if s < 0 else self._before(s) + len(self.gaps.get(s, ()))
+
 class ComplexVector:
-    def __init__(self, data: Optional[List[Complex]] = None):
+    def __init__(self, data: Optional[List[Complex]] = None, indexed: bool = False):
         self._data = data if data is not None else []
+        self._sorted = False     # 是否按 (模, 实部) 有序
+        self._index = None       # _SlotIndex：(re, im) -> 下标
+        self._stale = False      # 整体重排后索引失效，下次使用前重建
+        if indexed:
+            self.build_index()
+    @property
+    def is_sorted(self) -> bool:
+        return self._sorted
+    @property
+    def indexed(self) -> bool:
+        return self._index is not None
+    def build_index(self):
+        self._index, self._stale = _SlotIndex(self._data), False
+    def drop_index(self):
+        self._index = None
+    def _invalidate(self):
+        # 排序/置乱/唯一化等整体重排之后调用
+        self._stale = True
+    def _track(self) -> bool:
+        # 索引是否需要随单点插入/删除增量维护；间隙与失效槽累计过多时改为下次使用前重建
+        idx = self._index
+        if idx is None or self._stale:
+            return False
+        if idx.edits > len(self._data) // 2 + 16:
+            self._stale = True
+            return False
+        return True
     def shuffle(self):
         random.shuffle(self._data)
+        self._sorted = False
+        self._invalidate()
     def find(self, target: Complex) -> int:
+        if self._index is not None:
+            if self._stale:
+                self.build_index()
+            return self._index.find(target)
         for i, c in enumerate(self._data):
             if c == target:
                 return i
         return -1
     def insert(self, idx: int, c: Complex):
-        self._data.insert(idx, c)
+        a = self._data
+        n = len(a)
+        if idx < 0: idx = max(0, n + idx)
+        idx = min(idx, n)
+        if self._sorted:
+            # 插入位置不破坏次序时保持已序标记
+            self._sorted = (idx == 0 or not c < a[idx - 1]) and (idx == n or not a[idx] < c)
+        if self._track():
+            self._index.insert(idx, c, n)
+        a.insert(idx, c)
+    def insert_sorted(self, c: Complex) -> int:
+        """已序向量中二分定位插入 c，返回插入下标。"""
+        if not self._sorted:
+            raise ValueError("insert_sorted 需要已序向量")
+        idx = bisect_right(self._data, c)
+        self.insert(idx, c)
+        return idx
     def remove(self, idx: int) -> Complex:
-        return self._data.pop(idx)
+        a = self._data
+        if idx < 0: idx += len(a)
+        c = a.pop(idx)
+        if self._track():
+            self._index.remove(idx)
+        return c
     def uniquify(self):
+        if self._index is not None:
+            return self._uniquify_indexed()
         seen = set()
         new_data = []
         for c in self._data:
@@ -48,17 +379,39 @@ class ComplexVector:
                 seen.add(key)
                 new_data.append(c)
         self._data = new_data
+    def _uniquify_indexed(self):
+        # 由索引直接得到重复项下标，只删除重复项；索引未经单点修改时槽号即下标，无重复时 O(u) 返回
+        if self._stale or self._index.edits:
+            self.build_index()
+        drop = [i for lst in self._index.slots.values() if len(lst) > 1 for i in lst[1:]]
+        if not drop:
+            return
+        drop.sort()
+        a = self._data
+        if len(drop) * 8 < len(a):
+            for i in reversed(drop):
+                del a[i]
+        else:
+            dropped = set(drop)
+            self._data = [c for i, c in enumerate(a) if i not in dropped]
+        self._invalidate()
     def bubble_sort(self):
         a = self._data
         n = len(a)
+        on = PROBE.enabled
         for i in range(n - 1):
-            swapped = False
+            swapped = 0
             for j in range(n - 1 - i):
                 if a[j + 1] < a[j]:
                     a[j], a[j + 1] = a[j + 1], a[j]
-                    swapped = True
+                    swapped += 1
+            if on:
+                PROBE.add("exp1.sort.compare", n - 1 - i)
+                PROBE.add("exp1.sort.swap", swapped)
             if not swapped:
                 break
+        self._sorted = True
+        self._invalidate()
     def merge_sort(self):
         def merge(l, r):
             res, i, j = [], 0, 0
@@ -68,19 +421,154 @@ class ComplexVector:
                 else:
                     res.append(r[j]); j += 1
             res.extend(l[i:]); res.extend(r[j:])
+            if on:      # 循环每轮恰好一次比较、一次移动
+                PROBE.add("exp1.sort.compare", i + j)
+                PROBE.add("exp1.sort.move", len(res))
             return res
         def ms(a):
             if len(a) <= 1: return a
             mid = len(a) // 2
             return merge(ms(a[:mid]), ms(a[mid:]))
+        on = PROBE.enabled
         self._data = ms(self._data)
+        self._sorted = True
+        self._invalidate()
+    def _apply_perm(self, perm: List[int]):
+        a = self._data
+        a[:] = [a[i] for i in perm]
+        self._sorted = True
+        self._invalidate()
+    def merge_sort_bottom_up(self):
+        _merge_bu_inplace(self._data)
+        self._sorted = True
+        self._invalidate()
+    def tim_sort(self):
+        self._apply_perm(_timsort_perm(_sort_keys(self._data)))
+    def decorate_sort(self):
+        self._apply_perm(_decorate_perm(_sort_keys(self._data)))
+    def sort(self, strategy: str = "timsort"):
+        if strategy not in SORT_ENGINES:
+            raise ValueError(f"未知排序策略: {strategy}，可选 {list(SORT_ENGINES)}")
+        with PROBE.timer(f"exp1.sort.{strategy}"):
+            SORT_ENGINES[strategy](self)
     def range_query(self, m1: float, m2: float) -> "ComplexVector":
-        tmp = [c for c in self._data if m1 <= c.mod < m2]
-        tmp.sort()
-        return ComplexVector(tmp)
+        if self._sorted:
+            # 已序：两次二分 O(log n) 定位 [m1,m2)，结果即连续切片
+            a = self._data
+            lo = bisect_left(a, m1, key=_mod_key)
+            res = ComplexVector(a[lo:bisect_left(a, m2, lo, key=_mod_key)])
+        else:
+            tmp = [c for c in self._data if m1 <= c.mod < m2]
+            tmp.sort()
+            res = ComplexVector(tmp)
+        res._sorted = True
+        return res
     def __repr__(self):
         return "ComplexVector" + str(self._data)
 
+SORT_ENGINES = {
+    "bubble":   ComplexVector.bubble_sort,
+    "merge":    ComplexVector.merge_sort,
+    "merge_bu": ComplexVector.merge_sort_bottom_up,
+    "timsort":  ComplexVector.tim_sort,
+    "decorate": ComplexVector.decorate_sort,
+}
+
+class ColumnarComplexVector:
+    """列式存储：re/im/mod 三个 float64 连续数组，模长只在写入时计算一次。
+    查找、唯一化、按 (模, 实部) 排序、区间查询均为数组上的向量化操作。"""
+    def __init__(self, re=None, im=None):
+        if np is None:
+            raise ImportError("ColumnarComplexVector 需要 numpy")
+        self._re = np.asarray(re if re is not None else [], dtype=np.float64)
+        self._im = np.asarray(im if im is not None else [], dtype=np.float64)
+        if self._re.shape != self._im.shape or self._re.ndim != 1:
+            raise ValueError("re/im 必须是等长一维数组")
+        self._mod = np.hypot(self._re, self._im)
+        self._sorted = False
+    @classmethod
+    def _view(cls, re, im, mod, is_sorted: bool) -> "ColumnarComplexVector":
+        # 直接包装已有数组（可为切片视图），不复制、不重算模长
+        v = cls.__new__(cls)
+        v._re, v._im, v._mod, v._sorted = re, im, mod, is_sorted
+        return v
+    @property
+    def is_sorted(self) -> bool:
+        return self._sorted
+    @classmethod
+    def from_complex(cls, data: List[Complex]) -> "ColumnarComplexVector":
+        return cls([c.re for c in data], [c.im for c in data])
+    @classmethod
+    def from_vector(cls, vec: ComplexVector) -> "ColumnarComplexVector":
+        return cls.from_complex(vec._data)
+    def to_vector(self) -> ComplexVector:
+        return ComplexVector([Complex(r, i) for r, i in zip(self._re.tolist(), self._im.tolist())])
+    def _take(self, idx):
+        # 按下标数组/布尔掩码重排三列，避免重复计算模长
+        self._re, self._im, self._mod = self._re[idx], self._im[idx], self._mod[idx]
+    def __len__(self):
+        return self._re.size
+    def __getitem__(self, i) -> Complex:
+        return Complex(float(self._re[i]), float(self._im[i]))
+    def shuffle(self):
+        self._take(np.random.permutation(len(self)))
+        self._sorted = False
+    def find(self, target: Complex) -> int:
+        hits = np.flatnonzero((self._re == target.re) & (self._im == target.im))
+        return int(hits[0]) if hits.size else -1
+    def _sorted_pos(self, c: Complex) -> int:
+        # (模, 实部) 复合键上的 bisect_right
+        m = math.hypot(c.re, c.im)
+        lo = int(np.searchsorted(self._mod, m, "left"))
+        hi = int(np.searchsorted(self._mod, m, "right"))
+        return lo + int(np.searchsorted(self._re[lo:hi], c.re, "right"))
+    def insert(self, idx: int, c: Complex):
+        n = len(self)
+        if idx < 0: idx = max(0, n + idx)
+        idx = min(idx, n)
+        if self._sorted:
+            key = (math.hypot(c.re, c.im), c.re)
+            self._sorted = ((idx == 0 or (self._mod[idx - 1], self._re[idx - 1]) <= key) and
+                            (idx == n or key <= (self._mod[idx], self._re[idx])))
+        self._re = np.insert(self._re, idx, c.re)
+        self._im = np.insert(self._im, idx, c.im)
+        self._mod = np.insert(self._mod, idx, math.hypot(c.re, c.im))
+    def insert_sorted(self, c: Complex) -> int:
+        if not self._sorted:
+            raise ValueError("insert_sorted 需要已序向量")
+        idx = self._sorted_pos(c)
+        self.insert(idx, c)
+        return idx
+    def remove(self, idx: int) -> Complex:
+        c = self[idx]
+        self._re, self._im, self._mod = (np.delete(a, idx) for a in (self._re, self._im, self._mod))
+        return c
+    def uniquify(self):
+        if len(self) < 2:
+            return
+        # 稳定字典序排序后相邻比较，每组保留原下标最小者，再恢复原相对次序
+        order = np.lexsort((self._im, self._re))
+        r, i = self._re[order], self._im[order]
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = (r[1:] != r[:-1]) | (i[1:] != i[:-1])
+        self._take(np.sort(order[first]))
+    def sort(self):
+        # 主键模长、次键实部，lexsort 稳定，与 Complex.__lt__ 一致
+        self._take(np.lexsort((self._re, self._mod)))
+        self._sorted = True
+    merge_sort = sort
+    def range_query(self, m1: float, m2: float) -> "ColumnarComplexVector":
+        if self._sorted:
+            # 已序：searchsorted 二分，返回三列的零拷贝切片视图
+            lo, hi = np.searchsorted(self._mod, (m1, m2), "left")
+            return self._view(self._re[lo:hi], self._im[lo:hi], self._mod[lo:hi], True)
+        mask = (self._mod >= m1) & (self._mod < m2)
+        sub = self._view(self._re[mask], self._im[mask], self._mod[mask], False)
+        sub.sort()
+        return sub
+    def __repr__(self):
+        return "ColumnarComplexVector" + str([self[i] for i in range(len(self))])
+
 def demo():
     print("=== ComplexVector 功能演示 ===")
     n = 20
@@ -112,5 +600,96 @@ def demo():
     sub = vec_sorted.range_query(5, 10)
     print("模[5,10)区间:", sub)
 
+    if np is not None:
+        demo_columnar()
+
+def demo_columnar(n: int = 100000):
+    print("=== 列式存储对比（n={}） ===".format(n))
+    data = [Complex(random.randint(-1000, 1000), random.randint(-1000, 1000)) for _ in range(n)]
+    v1, v2 = ComplexVector(data.copy()), ColumnarComplexVector.from_complex(data)
+    for name, fn in [("查找", lambda v: v.find(data[-1])), ("唯一化", lambda v: v.uniquify()),
+                     ("排序", lambda v: v.merge_sort()), ("区间查询", lambda v: v.range_query(100, 500))]:
+        t0 = time.perf_counter(); fn(v1); t1 = time.perf_counter()
+        t2 = time.perf_counter(); fn(v2); t3 = time.perf_counter()
+        print(f"{name}: 列表{t1-t0:.4f}s  列式{t3-t2:.4f}s")
+
+def bench_find(sizes: Optional[List[int]] = None, queries: int = 10000):
+    """索引查找 vs 线性查找；线性查找的次数随规模缩减以控制总时长。"""
+    sizes = sizes or [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+    print("=== 查找：哈希索引 vs 线性扫描 ===")
+    for n in sizes:
+        data = [Complex(random.randint(-10 ** 6, 10 ** 6), random.randint(-10 ** 6, 10 ** 6)) for _ in range(n)]
+        vec = ComplexVector(data)
+        q_scan = max(3, min(queries, 10 ** 6 // n))
+        targets = [data[random.randrange(n)] for _ in range(queries)]
+        t0 = time.perf_counter()
+        for t in targets[:q_scan]: vec.find(t)
+        t1 = time.perf_counter()
+        vec.build_index()
+        t2 = time.perf_counter()
+        for t in targets: vec.find(t)
+        t3 = time.perf_counter()
+        scan, hashed = (t1 - t0) / q_scan, (t3 - t2) / queries
+        print(f"n={n:>9}: 线性{scan * 1e6:12.1f}us/次  索引{hashed * 1e6:8.3f}us/次  "
+              f"建索引{t2 - t1:.3f}s  加速{scan / hashed:.0f}x")
+        # 随机位置交替插入/查找/删除：索引随单点修改增量维护，查找不退化为 O(n) 扫描
+        rounds = max(3, min(1000, 10 ** 7 // n))
+        ops = [(random.randrange(n), data[random.randrange(n)], random.randrange(n)) for _ in range(rounds)]
+        cost = []
+        for indexed in (False, True):
+            v = ComplexVector(data[:], indexed)
+            t0 = time.perf_counter()
+            for pos, t, rm in ops:
+                v.insert(pos, t); v.find(t); v.remove(rm)
+            cost.append((time.perf_counter() - t0) / rounds)
+        print(f"{'':13}交替插入/查找/删除: 线性{cost[0] * 1e3:9.3f}ms/轮  索引{cost[1] * 1e3:9.3f}ms/轮")
+
+BUBBLE_LIMIT = 5000     # 起泡排序 O(n^2)，超过此规模跳过
+
+COUNTS = ("compare", "swap", "move")
+
+def bench_sort(sizes: Optional[List[int]] = None, csv_path: str = "sort_results.csv",
+               engines: Optional[List[str]] = None):
+    """顺序/乱序/逆序输入下各排序引擎的耗时与峰值内存（tracemalloc），写入 CSV。
+    开启插桩时另附比较/交换/移动次数（在不计时的内存测量那一轮统计）。"""
+    sizes = sizes or [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+    engines = engines or list(SORT_ENGINES)
+    rows = []
+    print("=== 排序引擎对比 ===")
+    for name, order in [("顺序", 0), ("乱序", 1), ("逆序", 2)]:
+        for n in sizes:
+            test = [Complex(random.randint(-50, 50), random.randint(-50, 50)) for _ in range(n)]
+            if order == 0:      test.sort()
+            elif order == 2:    test.sort(reverse=True)
+            line = []
+            for eng in engines:
+                if eng == "bubble" and n > BUBBLE_LIMIT:
+                    continue
+                v = ComplexVector(test.copy())
+                t0 = time.perf_counter(); v.sort(eng); t1 = time.perf_counter()
+                # 峰值内存单独测一次，避免 tracemalloc 的开销计入耗时
+                v = ComplexVector(test.copy())
+                before = PROBE.snapshot()
+                tracemalloc.start(); v.sort(eng)
+                peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+                rows.append([name, n, eng, t1 - t0, peak / 1024])
+                if PROBE.enabled:
+                    rows[-1] += [PROBE.counters[f"exp1.sort.{c}"] - before.get(f"exp1.sort.{c}", 0)
+                                 for c in COUNTS]
+                line.append(f"{eng}{t1 - t0:.4f}s/{peak / 1024:.0f}KiB")
+            print(f"{name} n={n}: " + "  ".join(line))
+    with open(csv_path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["order", "n", "engine", "seconds", "peak_kib"] +
+                        (list(COUNTS) if PROBE.enabled else []))
+        writer.writerows(rows)
+    print(f"结果已写入 {csv_path}")
+
+BENCHES = {"find": bench_find, "sort": bench_sort}
+
 if __name__ == "__main__":
-    demo()
+    # 用法: exp1.1.py [find|sort [n1 n2 ...]]，不带参数时运行演示
+    if len(sys.argv) > 1:
+        BENCHES[sys.argv[1]]([int(float(x)) for x in sys.argv[2:]] or None)
+    else:
+        demo()
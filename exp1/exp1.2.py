@@ -4,9 +4,31 @@
 calculator.py
 基于栈和优先级表实现字符串计算器。
 支持 + - * / ^ 以及一元 +-，并扩展支持 math 库单目函数（sin/cos/tan/log/ln/sqrt…）。
+compile() 将表达式编译为可复用的 CompiledExpr，并以有界 LRU 缓存按表达式字符串复用。
+支持具名变量（如 sin(x)*a + log(y)），evaluate_batch() 在 numpy 数组上一次性向量化求值。
+编译时折叠常量子表达式，并将后缀序列生成为 Python 函数，重复求值无逐 token 解释开销。
+命令行 eval 模式从文件/标准输入逐行读取表达式，进程池分块求值，按输入顺序流式输出。
+词法分析与求值（解释器或生成的函数）处理的 token 数、编译缓存命中/未命中次数计入 instrument.PROBE
+（calculator.tokens / calculator.eval_tokens / calculator.cache_hits / calculator.cache_misses）。
 """
+import argparse
+import itertools
 import math
+import operator
+import os
 import re
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:     # 批量求值为可选功能
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from instrument import PROBE
 
 class ArrayStack:
     def __init__(self):
@@ -17,22 +39,37 @@ class ArrayStack:
     def empty(self):        return len(self._s) == 0
 
 class Calculator:
+    # 后缀序列中：'@name' 为函数调用，标识符为变量，其余为数字字面量
     priority = {'+': 1, '-': 1, '*': 2, '/': 2, '^': 3,
-                'u+': 4, 'u-': 4, 'func': 5}
-    right_assoc = {'^', 'func'}
+                'u+': 4, 'u-': 4}
+    right_assoc = {'^', 'u+', 'u-'}
     func_map = {name: obj for name, obj in math.__dict__.items()
                 if callable(obj) and name != 'pow'}
+    constants = {'pi': math.pi, 'e': math.e, 'tau': math.tau}
+    # math 函数名与 numpy 不一致者
+    np_alias = {'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan',
+                'asinh': 'arcsinh', 'acosh': 'arccosh', 'atanh': 'arctanh'}
+    _pattern = re.compile(r"\s*(?:((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|([a-zA-Z_]\w*)|(\S))")
     @classmethod
     def tokenize(cls, expr: str):
-        pattern = re.compile(r"\d+(?:\.\d+)?|[a-zA-Z_]\w*(?= $)|[()+\-*/^]|.")
-        tokens = [t.strip() for t in pattern.findall(expr) if t.strip()]
+        raw = []
+        for num, name, sym in cls._pattern.findall(expr):
+            if sym and sym not in '()+-*/^':
+                raise ValueError(f"非法字符: {sym}")
+            raw.append(num or name or sym)
         res, prev = [], '('
-        for tok in tokens:
-            if tok in '+-' and prev in '(@^':
-                res.append('u' + tok)
-            else:
-                res.append(tok)
+        for k, tok in enumerate(raw):
+            if tok in ('+', '-') and (prev == '(' or prev in cls.priority or prev[0] == '@'):
+                tok = 'u' + tok
+            elif tok[0].isalpha() or tok[0] == '_':
+                if k + 1 < len(raw) and raw[k + 1] == '(':     # 标识符后紧跟 '(' 为函数调用
+                    if tok not in cls.func_map:
+                        raise ValueError(f"未知函数: {tok}")
+                    tok = '@' + tok
+            res.append(tok)
             prev = tok
+        if PROBE.enabled:
+            PROBE.add("calculator.tokens", len(res))
         return res
     @classmethod
     def infix_to_postfix(cls, tokens):
@@ -45,9 +82,11 @@ class Calculator:
                     out.append(ops.pop())
                 if ops.empty(): raise ValueError("Mismatched )")
                 ops.pop()
-                if not ops.empty() and ops.top() == 'func':
+                if not ops.empty() and ops.top()[0] == '@':
                     out.append(ops.pop())
-            elif t in cls.priority or t == 'func':
+            elif t[0] == '@':
+                ops.push(t)
+            elif t in cls.priority:
                 while not ops.empty() and ops.top() != '(':
                     top = ops.top()
                     if (top in cls.priority and
@@ -65,16 +104,21 @@ class Calculator:
             out.append(ops.pop())
         return out
     @classmethod
-    def eval_postfix(cls, post):
+    def _lookup(cls, name: str, env):
+        if env is not None and name in env:
+            return env[name]
+        if name in cls.constants:
+            return cls.constants[name]
+        raise ValueError(f"未定义变量: {name}")
+    @classmethod
+    def eval_postfix(cls, post, env=None, funcs=None, num=float):
+        funcs = cls.func_map if funcs is None else funcs
         st = ArrayStack()
         for t in post:
             if t in cls.priority:
                 if t.startswith('u'):
                     a = st.pop()
                     st.push(-a if t == 'u-' else a)
-                elif t == 'func':
-                    fn, arg = st.pop(), st.pop()
-                    st.push(cls.func_map[fn](arg))
                 else:
                     b, a = st.pop(), st.pop()
                     if t == '+': st.push(a + b)
@@ -82,14 +126,223 @@ class Calculator:
                     elif t == '*': st.push(a * b)
                     elif t == '/': st.push(a / b)
                     elif t == '^': st.push(a ** b)
+            elif t[0] == '@':
+                st.push(funcs[t[1:]](st.pop()))
+            elif t[0].isalpha() or t[0] == '_':
+                st.push(cls._lookup(t, env))
             else:
-                st.push(float(t))
+                st.push(num(t))
+        if PROBE.enabled:
+            PROBE.add("calculator.eval_tokens", len(post))
         return st.pop()
+    # ---------- 编译优化：常量折叠 + 代码生成 ----------
+    _binops = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+               '/': operator.truediv, '^': operator.pow}
+    # 二元运算符 -> (Python 运算符, Python 优先级)；原子 9，幂 7，一元 6，乘除 5，加减 4
+    _py_ops = {'+': (' + ', 4), '-': (' - ', 4), '*': ('*', 5), '/': ('/', 5), '^': ('**', 7)}
+    @classmethod
+    def _apply(cls, t, args):
+        if t == 'u-': return -args[0]
+        if t == 'u+': return args[0]
+        if t[0] == '@': return cls.func_map[t[1:]](args[0])
+        return cls._binops[t](*args)
+    @classmethod
+    def fold_constants(cls, post) -> list:
+        """折叠全部操作数均为字面量的子表达式；求值出错或结果非有限浮点数时保留原样留待运行时。"""
+        out, spans = [], []     # spans: 每个栈元素在 out 中的起点及其常量值（非常量为 None）
+        for t in post:
+            if t in cls.priority or t[0] == '@':
+                k = 1 if t[0] in 'u@' else 2
+                if len(spans) < k:
+                    raise ValueError("表达式不完整")
+                args = spans[-k:]
+                start = args[0][0]
+                del spans[-k:]
+                v = None
+                if all(a[1] is not None for a in args):
+                    try:
+                        v = cls._apply(t, [a[1] for a in args])
+                    except (ArithmeticError, ValueError, TypeError):
+                        v = None
+                    if not (isinstance(v, float) and math.isfinite(v)):
+                        v = None
+                if v is None:
+                    out.append(t)
+                else:
+                    del out[start:]
+                    out.append(repr(v))
+                spans.append((start, v))
+            else:
+                v = None if (t[0].isalpha() or t[0] == '_') else float(t)
+                spans.append((len(out), v))
+                out.append(t)
+        if len(spans) != 1:
+            raise ValueError("表达式不完整")
+        return out
+    @classmethod
+    def to_source(cls, post, consts=None):
+        """后缀序列 -> (Python 表达式源码, 变量名集合)；按优先级最少加括号。
+        给出 consts 字典时字面量改为名字 c_0, c_1…，其值登记在 consts 中，由调用方绑定。"""
+        def wrap(src, p, need):
+            return src if p >= need else f"({src})"
+        st, names = [], set()
+        try:
+            for t in post:
+                if t in ('u+', 'u-'):
+                    a, p = st.pop()
+                    st.append((f"-{wrap(a, p, 6)}", 6) if t == 'u-' else (a, p))
+                elif t in cls.priority:
+                    (b, pb), (a, pa) = st.pop(), st.pop()
+                    op, p = cls._py_ops[t]
+                    lmin, rmin = (8, 6) if t == '^' else (p, p + 1)
+                    st.append((f"{wrap(a, pa, lmin)}{op}{wrap(b, pb, rmin)}", p))
+                elif t[0] == '@':
+                    a, _ = st.pop()
+                    st.append((f"f_{t[1:]}({a})", 9))
+                elif t[0].isalpha() or t[0] == '_':
+                    names.add(t)
+                    st.append((f"v_{t}", 9))
+                elif consts is not None:
+                    r = f"c_{len(consts)}"
+                    consts[r] = float(t)
+                    st.append((r, 9))
+                else:
+                    v = float(t)    # 溢出的字面量（如 1e999）为 inf，不是合法的 Python 字面量，绑定为名字
+                    r = repr(v) if math.isfinite(v) else f"_{v!r}"
+                    st.append((r, 6 if r[0] == '-' else 9))
+        except IndexError:
+            raise ValueError("表达式不完整") from None
+        if len(st) != 1:
+            raise ValueError("表达式不完整")
+        return st[0][0], names
+    @classmethod
+    def build_function(cls, post, funcs=None, num=None):
+        """生成并编译 def _compiled(env): ...，funcs 决定函数名绑定（math 或 numpy）。
+        给出 num（如 np.float64）时字面量以 num(值) 绑定，常量子表达式按其类型的语义求值。"""
+        funcs = cls.func_map if funcs is None else funcs
+        consts = None if num is None else {}
+        body, names = cls.to_source(post, consts)
+        lines = ["def _compiled(env):"]
+        lines += [f"    v_{n} = _lookup({n!r}, env)" for n in sorted(names)]
+        lines.append(f"    return {body}")
+        ns = {"_lookup": cls._lookup, "_inf": math.inf, "_nan": math.nan}
+        ns.update({f"f_{t[1:]}": funcs[t[1:]] for t in post if t[0] == '@'})
+        ns.update({k: num(v) for k, v in (consts or {}).items()})
+        exec(compile("\n".join(lines), "<calculator>", "exec"), ns)
+        return ns["_compiled"]
+    _np_funcs = None
+    @classmethod
+    def np_func_map(cls) -> dict:
+        """func_map 的 numpy 向量化版本；numpy 无对应 ufunc 时退化为 np.vectorize。"""
+        if np is None:
+            raise ImportError("批量求值需要 numpy")
+        if Calculator._np_funcs is None:
+            Calculator._np_funcs = {
+                name: getattr(np, cls.np_alias.get(name, name), None) or np.vectorize(fn, otypes=[float])
+                for name, fn in cls.func_map.items()}
+        return Calculator._np_funcs
+    @classmethod
+    def _batch_env(cls, env):
+        # 变量与内置常量都转为 numpy 值，常量子表达式（如 1/0、pi/0）同样按 numpy 语义得到 inf/nan
+        cols = {k: np.float64(v) for k, v in cls.constants.items()}
+        cols.update((k, np.asarray(v, dtype=np.float64)) for k, v in (env or {}).items())
+        return cols
+    @staticmethod
+    def _batch_result(res, cols):
+        # 不含变量的表达式结果为标量，按输入列的广播形状展开，与含变量时的输出形状一致
+        res = np.asarray(res, dtype=np.float64)
+        if res.ndim == 0:
+            shape = np.broadcast_shapes(*(c.shape for c in cols.values()))
+            if shape:
+                res = np.full(shape, res)
+        return res
+    @classmethod
+    def eval_batch(cls, post, env=None):
+        """一次遍历后缀序列，操作数为整列数组；env 为 变量名 -> 数组/标量 的映射。"""
+        funcs = cls.np_func_map()
+        cols = cls._batch_env(env)
+        with np.errstate(all='ignore'):     # 与逐行 math 不同，定义域错误得到 nan/inf 而非异常
+            return cls._batch_result(cls.eval_postfix(post, cols, funcs, np.float64), cols)
+    # 编译缓存：表达式字符串 -> CompiledExpr，超出 cache_size 时淘汰最久未用项
+    cache_size = 1024
+    _cache = OrderedDict()
+    _hits = 0
+    _misses = 0
     @classmethod
-    def calculate(cls, expr: str):
-        tokens = cls.tokenize(expr)
-        post = cls.infix_to_postfix(tokens)
-        return cls.eval_postfix(post)
+    def compile(cls, expr: str) -> "CompiledExpr":
+        c = cls._cache.get(expr)
+        if c is not None:               # 命中：跳过分词与中缀转后缀
+            cls._cache.move_to_end(expr)
+            Calculator._hits += 1
+            if PROBE.enabled:
+                PROBE.add("calculator.cache_hits")
+            return c
+        Calculator._misses += 1
+        if PROBE.enabled:
+            PROBE.add("calculator.cache_misses")
+        c = CompiledExpr(expr, tuple(cls.fold_constants(cls.infix_to_postfix(cls.tokenize(expr)))), cls)
+        cls._cache[expr] = c
+        if len(cls._cache) > cls.cache_size:
+            cls._cache.popitem(last=False)
+        return c
+    @classmethod
+    def cache_info(cls) -> dict:
+        return {"hits": Calculator._hits, "misses": Calculator._misses,
+                "size": len(cls._cache), "maxsize": cls.cache_size}
+    @classmethod
+    def cache_clear(cls):
+        cls._cache.clear()
+        Calculator._hits = Calculator._misses = 0
+    @classmethod
+    def calculate(cls, expr: str, env=None, **variables):
+        return cls.compile(expr).evaluate(env, **variables)
+    @classmethod
+    def calculate_batch(cls, expr: str, env=None, **columns):
+        return cls.compile(expr).evaluate_batch(env, **columns)
+
+class CompiledExpr:
+    """已编译表达式：保存（常量折叠后的）后缀序列及由其生成的 Python 函数。
+    首次求值走解释器，第二次起才生成函数，一次性表达式（如批量日志）不付代码生成开销。"""
+    __slots__ = ("expr", "postfix", "variables", "_calc", "_fn", "_batch_fn", "_runs")
+    def __init__(self, expr: str, postfix: tuple, calc=Calculator):
+        self.expr, self.postfix, self._calc = expr, postfix, calc
+        self.variables = frozenset(t for t in postfix
+                                   if (t[0].isalpha() or t[0] == '_') and t not in calc.priority)
+        self._fn = self._batch_fn = None    # None: 尚未生成；False: 无法生成（嵌套过深）
+        self._runs = 0
+    def _build(self, funcs=None, num=None):
+        try:
+            return self._calc.build_function(self.postfix, funcs, num)
+        except (SyntaxError, RecursionError, MemoryError):
+            return False
+    def evaluate(self, env=None, **variables):
+        if variables:
+            env = {**env, **variables} if env else variables
+        fn = self._fn
+        if fn is None:
+            self._runs += 1
+            if self._runs > 1:
+                fn = self._fn = self._build()
+        if not fn:
+            return self._calc.eval_postfix(self.postfix, env)     # 解释器自行计数
+        if PROBE.enabled:
+            PROBE.add("calculator.eval_tokens", len(self.postfix))
+        return fn(env)
+    def evaluate_batch(self, env=None, **columns):
+        if columns:
+            env = {**env, **columns} if env else columns
+        if self._batch_fn is None:
+            self._batch_fn = self._build(self._calc.np_func_map(), np.float64)
+        if not self._batch_fn:
+            return self._calc.eval_batch(self.postfix, env)
+        cols = self._calc._batch_env(env)
+        if PROBE.enabled:   # 整列一次求值，每个 token 计一次
+            PROBE.add("calculator.eval_tokens", len(self.postfix))
+        with np.errstate(all='ignore'):
+            return self._calc._batch_result(self._batch_fn(cols), cols)
+    __call__ = evaluate
+    def __repr__(self):
+        return f"CompiledExpr({self.expr!r})"
 
 def demo():
     print("=== 字符串计算器演示 ===")
@@ -104,6 +357,95 @@ def demo():
             print(f"{c}  =  {Calculator.calculate(c)}")
         except Exception as e:
             print(f"{c}  ERROR: {e}")
+    for c in cases * 2:
+        try:
+            Calculator.calculate(c)
+        except Exception:
+            pass
+    print("编译缓存:", Calculator.cache_info())
+
+    f = Calculator.compile("sin(x)*a + log(y)")
+    print(f"{f.expr}  (x=1, a=2, y=e) =  {f(x=1, a=2, y=math.e)}")
+    if np is not None:
+        n = 10 ** 6
+        x, y = np.linspace(0, 1, n), np.linspace(1, 2, n)
+        print(f"{f.expr}  批量 {n} 行, 末行 = {f.evaluate_batch(x=x, a=2.0, y=y)[-1]}")
+
+def bench_eval(repeat: int = 100000):
+    """演示用例上：逐 token 解释执行 vs 常量折叠 + 生成函数。"""
+    print(f"=== 求值微基准（每式 {repeat} 次） ===")
+    cases = [
+        "3+4*2/(1-5)^2",
+        "-3 + -4 * (2 + 5)",
+        "sin(30*3.1415926/180)*2 + log(100)",
+        "(1+2)*3^2",
+        "sin(x)*a + log(y)",
+    ]
+    env = {"x": 0.5, "a": 2.0, "y": 3.0}
+    for c in cases:
+        post = Calculator.infix_to_postfix(Calculator.tokenize(c))
+        comp = Calculator.compile(c)
+        t0 = time.perf_counter()
+        for _ in range(repeat): Calculator.eval_postfix(post, env)
+        t1 = time.perf_counter()
+        for _ in range(repeat): comp.evaluate(env)
+        t2 = time.perf_counter()
+        print(f"{c:40} 解释{(t1 - t0) / repeat * 1e6:7.3f}us  编译{(t2 - t1) / repeat * 1e6:7.3f}us  "
+              f"加速{(t1 - t0) / (t2 - t1):5.1f}x  折叠后: {' '.join(comp.postfix)}")
+
+def _eval_line(line: str) -> str:
+    expr = line.strip()
+    if not expr:
+        return ""
+    try:
+        return repr(Calculator.calculate(expr))
+    except Exception as e:      # 单行出错只记录，不中断整批
+        return f"ERROR: {type(e).__name__}: {e}"
+
+def _eval_chunk(lines):
+    return [_eval_line(l) for l in lines]
+
+def evaluate_stream(lines, workers: int = 1, chunk_size: int = 10000):
+    """逐行求值并按输入顺序产出结果。
+    输入按 chunk_size 行切块，同时在途的块不超过 2*workers 个，内存占用与输入总量无关。"""
+    it = iter(lines)
+    chunks = iter(lambda: list(itertools.islice(it, chunk_size)), [])
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _eval_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_eval_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="字符串计算器")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("demo", help="运行演示（默认）")
+    sub.add_parser("bench", help="求值微基准")
+    ev = sub.add_parser("eval", help="逐行求值文件或标准输入中的表达式")
+    ev.add_argument("input", nargs="?", default="-", help="输入文件，- 表示标准输入")
+    ev.add_argument("-o", "--output", default="-", help="输出文件，- 表示标准输出")
+    ev.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    ev.add_argument("-c", "--chunk-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+    if args.cmd == "bench":
+        return bench_eval()
+    if args.cmd != "eval":
+        return demo()
+    fin = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for res in evaluate_stream(fin, args.workers, args.chunk_size):
+            fout.write(res + "\n")
+    finally:
+        if fin is not sys.stdin: fin.close()
+        if fout is not sys.stdout: fout.close()
 
 if __name__ == "__main__":
-    demo()
+    main()
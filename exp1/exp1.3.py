@@ -4,9 +4,17 @@
 largest_rectangle.py
 给定非负整数数组 heights，求柱状图能勾勒出的最大矩形面积。
 单调栈 O(n) 实现，并随机生成 10 组数据演示。
+largestRectangleAreaBuffer 面向超大输入：直接读取 array/memoryview/numpy（含内存映射文件），
+不复制输入、不追加哨兵，单调栈放在预分配的定长整型数组中。
+RectangleStream 分块流式输入，跨块保持单调栈；maximalRectangle 逐行处理 0/1 矩阵。
 """
+import mmap
 import random
-from typing import List
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Iterable, List, Tuple
 
 class ArrayStack:
     def __init__(self):
@@ -29,6 +37,116 @@ def largestRectangleArea(heights: List[int]) -> int:
         st.push(i)
     return max_a
 
+def _as_view(buf) -> memoryview:
+    # 按缓冲区零拷贝读取；memoryview 无法取元素的格式（如 numpy 非本机字节序 '>i4'）转为本机字节序副本
+    h = memoryview(buf)
+    if h.ndim == 1:
+        try:
+            h[:0].tolist()      # 只检查格式，不读数据
+        except NotImplementedError:
+            if not hasattr(buf, "dtype"):
+                raise TypeError(f"不支持的缓冲区格式: {h.format}") from None
+            h = memoryview(buf.astype(buf.dtype.newbyteorder('=')))
+    return h
+
+def largestRectangleAreaBuffer(heights) -> int:
+    """heights 可为 list、array.array、memoryview、numpy 一维数组或 np.memmap。"""
+    h = heights if isinstance(heights, (list, tuple)) else _as_view(heights)
+    if isinstance(h, memoryview) and h.ndim != 1:
+        raise ValueError("heights 必须是一维数组")
+    n = len(h)
+    # 栈容量最坏为 n+1（含栈底 -1），按下标范围选 4/8 字节整型
+    st = array('i' if n < 2 ** 31 - 1 else 'q', [0]) * (n + 1)
+    st[0] = -1
+    top, max_a = 0, 0
+    for i, x in enumerate(h):
+        while top and h[st[top]] > x:
+            H = h[st[top]]
+            top -= 1
+            a = H * (i - st[top] - 1)
+            if a > max_a: max_a = a
+        top += 1
+        st[top] = i
+    while top:                      # 尾部结算，等价于高度 0 的哨兵
+        H = h[st[top]]
+        top -= 1
+        a = H * (n - st[top] - 1)
+        if a > max_a: max_a = a
+    return max_a
+
+class RectangleStream:
+    """流式最大矩形：feed() 逐块送入高度，单调栈（下标, 高度）跨块保留。
+    current() 给出已读前缀的最大面积；finish() 结算并返回 (面积, 起始柱, 结束柱)，柱下标为闭区间，
+    随后重置状态，之后 feed() 的数据作为一条新的流从下标 0 计起。"""
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        self._idx, self._h = [], []     # 单调栈：柱下标与高度（已读数据不再保留）
+        self._n = 0                     # 已读柱数
+        self._best = (0, -1, -1)
+    def feed(self, chunk: Iterable) -> "RectangleStream":
+        idx, hs = self._idx, self._h
+        best_a = self._best[0]
+        i = self._n
+        if not isinstance(chunk, (list, tuple)):
+            try:
+                chunk = _as_view(chunk)         # array/numpy 块按缓冲区读取，迭代得到 Python 数
+            except TypeError:
+                pass
+        for x in chunk:
+            while hs and hs[-1] > x:
+                H = hs.pop(); idx.pop()
+                left = idx[-1] if idx else -1
+                a = H * (i - left - 1)
+                if a > best_a:
+                    best_a = a
+                    self._best = (a, left + 1, i - 1)
+            idx.append(i); hs.append(x)
+            i += 1
+        self._n = i
+        return self
+    def _flush(self):
+        # 以高度 0 的虚拟柱结算栈内剩余矩形，不修改状态
+        best, n, idx, hs = self._best, self._n, self._idx, self._h
+        for k in range(len(idx) - 1, -1, -1):
+            left = idx[k - 1] if k else -1
+            a = hs[k] * (n - left - 1)
+            if a > best[0]:
+                best = (a, left + 1, n - 1)
+        return best
+    def current(self) -> int:
+        return self._flush()[0]
+    def finish(self) -> Tuple[int, int, int]:
+        best = self._flush()
+        self.reset()
+        return best
+    def __len__(self):
+        return self._n
+
+def maximalRectangle(rows: Iterable) -> Tuple[int, int, int, int, int]:
+    """0/1 矩阵最大全 1 矩形，逐行读取（行可为 '0101' 字符串或 0/1 序列）。
+    返回 (面积, 上, 左, 下, 右)，均为闭区间下标；无全 1 格时为 (0, -1, -1, -1, -1)。"""
+    heights, eng = None, RectangleStream()
+    best = (0, -1, -1, -1, -1)
+    for r, row in enumerate(rows):
+        if heights is None:
+            heights = array('i', [0]) * len(row)
+        elif len(row) != len(heights):
+            raise ValueError(f"第 {r} 行长度不一致")
+        for c, v in enumerate(row):
+            heights[c] = heights[c] + 1 if v and v != '0' else 0
+        a, left, right = eng.feed(heights).finish()
+        if a > best[0]:
+            H = a // (right - left + 1)
+            best = (a, r - H + 1, left, r, right)
+    return best
+
+def open_heights(path: str, typecode: str = 'i') -> memoryview:
+    """以只读内存映射打开原始二进制高度文件（本机字节序），返回零拷贝的 memoryview。"""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
 def demo():
     print("=== 柱状图最大矩形演示 ===")
     random.seed(0)
@@ -38,5 +156,38 @@ def demo():
         area = largestRectangleArea(h)
         print(f"heights={h}  =>  maxArea={area}")
 
+    stream = RectangleStream()
+    h = [random.randint(0, 10) for _ in range(30)]
+    for k in range(0, len(h), 7):
+        stream.feed(h[k:k + 7])
+        print(f"流式已读 {len(stream)} 柱, 当前最大面积 {stream.current()}")
+    print("流式结果 (面积, 起, 止):", stream.finish(), " 整体计算:", largestRectangleArea(h))
+    h = [random.randint(0, 10) for _ in range(12)]     # finish() 后同一引擎处理新的流
+    res = stream.feed(h[:5]).feed(h[5:]).finish()
+    assert res[0] == largestRectangleArea(h)
+    print("复用引擎结果:", res, " 整体计算:", largestRectangleArea(h))
+    matrix = ["10100", "10111", "11111", "10010"]
+    print("0/1 矩阵", matrix, "最大矩形 (面积, 上, 左, 下, 右):", maximalRectangle(matrix))
+
+def bench(sizes: List[int] = None):
+    """list + 哨兵拷贝版 vs 缓冲区版：吞吐量与 tracemalloc 峰值（不含输入本身）。"""
+    sizes = sizes or [10 ** 5, 10 ** 6, 10 ** 7]
+    print("=== 最大矩形：list 版 vs 缓冲区版 ===")
+    for n in sizes:
+        h = array('i', random.choices(range(10 ** 4), k=n))
+        res = []
+        for name, fn, arg in [("list", largestRectangleArea, h.tolist()),
+                              ("buffer", largestRectangleAreaBuffer, h)]:
+            t0 = time.perf_counter(); area = fn(arg); t1 = time.perf_counter()
+            tracemalloc.start(); fn(arg)
+            peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            res.append(area)
+            print(f"n={n:>10} {name:>6}: {n / (t1 - t0) / 1e6:6.2f} M元素/s  峰值{peak / 2 ** 20:8.1f} MiB")
+        assert res[0] == res[1]
+
 if __name__ == "__main__":
-    demo()
+    # 用法: exp1.3.py [bench [n1 n2 ...]]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench([int(float(x)) for x in sys.argv[2:]] or None)
+    else:
+        demo()
@@ -1,62 +1,417 @@
 import sys
+import heapq
+import io
+import mmap
+import os
+import random
+import struct
+import time
+from array import array
+from bisect import insort
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import shared_memory
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:     # 仅用于批量加载时向量化构建 CSR，无 numpy 时逐边循环
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from instrument import PROBE
+
+_vertex_key = itemgetter(0)
+
+
+# ---------- 优先队列：统一接口 push(key, item) / pop() -> (key, item)，过期项由调用方惰性跳过 ----------
+class BinaryHeap(list):
+    def push(self, key, item):
+        heapq.heappush(self, (key, item))
+
+    def pop(self):
+        return heapq.heappop(self)
+
+
+class PairingHeap:
+    # 结点为 [key, item, 第一个孩子, 右兄弟]
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _meld(a, b):
+        if b[0] < a[0]:
+            a, b = b, a
+        b[3] = a[2]
+        a[2] = b
+        return a
+
+    def push(self, key, item):
+        node = [key, item, None, None]
+        self._root = node if self._root is None else self._meld(self._root, node)
+        self._size += 1
+
+    def pop(self):
+        root = self._root
+        if root is None:
+            raise IndexError("pop from empty heap")
+        # 两趟配对：先两两合并孩子，再自右向左合并
+        pairs = []
+        c = root[2]
+        while c is not None:
+            b = c[3]
+            if b is None:
+                pairs.append(c)
+                break
+            nxt = b[3]
+            c[3] = b[3] = None
+            pairs.append(self._meld(c, b))
+            c = nxt
+        r = None
+        for node in reversed(pairs):
+            r = node if r is None else self._meld(node, r)
+        self._root = r
+        self._size -= 1
+        return root[0], root[1]
+
+
+class RadixHeap:
+    # 仅适用于非负整数键且弹出键单调不减（Dijkstra 满足，Prim 不满足）
+    def __init__(self):
+        self._last = 0
+        self._buckets = [[] for _ in range(65)]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, key, item):
+        if not isinstance(key, int):
+            raise TypeError("RadixHeap 只支持整数权值")
+        if key < self._last:
+            raise ValueError("RadixHeap 要求键单调不减")
+        i = (key ^ self._last).bit_length()
+        while i >= len(self._buckets):
+            self._buckets.append([])
+        self._buckets[i].append((key, item))
+        self._size += 1
+
+    def pop(self):
+        if not self._size:
+            raise IndexError("pop from empty heap")
+        b = self._buckets
+        if not b[0]:
+            i = 1
+            while not b[i]:
+                i += 1
+            bucket, b[i] = b[i], []
+            self._last = last = min(bucket)[0]
+            for key, item in bucket:
+                b[(key ^ last).bit_length()].append((key, item))
+        self._size -= 1
+        return b[0].pop()
+
+
+HEAPS = {"binary": BinaryHeap, "pairing": PairingHeap, "radix": RadixHeap}
+
+
+class DisjointSet:
+    # 并查集：按大小合并 + 路径减半，均摊近似 O(1)
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.count = n  # 连通分量数
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.count -= 1
+        return True
+
+
+class DynamicForest:
+    # 随边到达维护最小支撑森林（只增边）：
+    # 跨分量的边直接连入（Kruskal）；成环的边与环上（树路径上）最重边比较，更轻则替换之。
+    # 森林以有根树存储：parent[u] 为父顶点（根为 -1），pw[u] 为 u 到父亲的边权
+    def __init__(self, n):
+        self.dsu = DisjointSet(n)
+        self.parent = [-1] * n
+        self.pw = [0] * n
+        self.weight = 0
+
+    def connected(self, u, v):
+        return self.dsu.find(u) == self.dsu.find(v)
+
+    def _evert(self, u):
+        # 把 u 变为所在树的根：反转 u 到根路径上的父指针
+        parent, pw = self.parent, self.pw
+        prev, w_prev = -1, 0
+        while u != -1:
+            nxt, w_nxt = parent[u], pw[u]
+            parent[u], pw[u] = prev, w_prev
+            prev, w_prev, u = u, w_nxt, nxt
+
+    def add(self, u, v, weight):
+        if u == v:
+            return
+        dsu = self.dsu
+        ru, rv = dsu.find(u), dsu.find(v)
+        if ru != rv:
+            if dsu.size[ru] > dsu.size[rv]:
+                u, v = v, u  # 换根较小的一侧
+            self._evert(u)
+            self.parent[u], self.pw[u] = v, weight
+            dsu.union(ru, rv)
+            self.weight += weight
+            return
+        # 同一分量：找 u、v 树路径上的最重边
+        parent, pw = self.parent, self.pw
+        up = {}
+        x = u
+        while x != -1:
+            up[x] = len(up)
+            x = parent[x]
+        heavy, heavy_w, on_u = -1, weight, False
+        x = v
+        while x not in up:
+            if pw[x] > heavy_w:
+                heavy, heavy_w = x, pw[x]
+            x = parent[x]
+        lca = x
+        x = u
+        while x != lca:
+            if pw[x] > heavy_w:
+                heavy, heavy_w, on_u = x, pw[x], True
+            x = parent[x]
+        if heavy == -1:
+            return  # 新边不比环上任何树边轻
+        self.parent[heavy] = -1  # 切掉最重边，heavy 成为其子树的根
+        if not on_u:
+            u, v = v, u  # 保证 u 落在被切下的子树中
+        self._evert(u)
+        self.parent[u], self.pw[u] = v, weight
+        self.weight += weight - heavy_w
+
+    def edges(self):
+        return [(u, p, self.pw[u]) for u, p in enumerate(self.parent) if p != -1]
+
 
 class Graph:
-    def __init__(self, num_vertices, is_directed=False):
+    def __init__(self, num_vertices, is_directed=False, labels=None):
+        self._init_state(num_vertices, is_directed, labels)
+        self.adj_list = [[] for _ in range(num_vertices)]
+
+    def _init_state(self, num_vertices, is_directed, labels):
+        # Graph 与 CSRGraph 共用的字段初始化，邻接存储由各自的构造函数设置
+        if labels is not None and len(labels) != num_vertices:
+            raise ValueError("标签数与顶点数不一致")
         self.num_vertices = num_vertices
         self.is_directed = is_directed
-        self.adj_matrix = [[0] * num_vertices for _ in range(num_vertices)] 
-        self.adj_list = [[] for _ in range(num_vertices)]
+        self.labels = labels      # 顶点标签；各输出方法未显式传入 vertex_labels 时使用
+        self._adj_matrix = None  # 稠密矩阵 V×V，仅在首次访问 adj_matrix 时构建
+        self._sorted_adj = False  # finalize() 后各邻接表按邻点下标有序
+        self._rev = None          # 反向图缓存（有向图双向搜索/路标用）
+        self._landmarks = None    # ALT 路标距离表
+        self._dyn = None          # 增量模式下的 DynamicForest
+
+    @property
+    def adj_matrix(self):
+        if self._adj_matrix is None:
+            m = [[0] * self.num_vertices for _ in range(self.num_vertices)]
+            for u in range(self.num_vertices):
+                for v, weight in self.adj_list[u]:
+                    m[u][v] = weight
+            self._adj_matrix = m
+        return self._adj_matrix
 
     def add_edge(self, u, v, weight=1):
-        self.adj_matrix[u][v] = weight
-        self.adj_list[u].append((v, weight))
-        if not self.is_directed: 
-            self.adj_matrix[v][u] = weight
-            self.adj_list[v].append((u, weight))
+        if self._sorted_adj:
+            # 已定型：二分插入到相同邻点的最后，与对追加序列做稳定排序的结果一致
+            insort(self.adj_list[u], (v, weight), key=_vertex_key)
+            if not self.is_directed:
+                insort(self.adj_list[v], (u, weight), key=_vertex_key)
+        else:
+            self.adj_list[u].append((v, weight))
+            if not self.is_directed:
+                self.adj_list[v].append((u, weight))
+        if self._adj_matrix is not None:
+            self._adj_matrix[u][v] = weight
+            if not self.is_directed:
+                self._adj_matrix[v][u] = weight
+        self._rev = None
+        self._landmarks = None  # 新边可能缩短距离，旧路标下界不再可靠
+        if self._dyn is not None:
+            self._dyn.add(u, v, weight)
 
-    def print_adj_matrix(self, vertex_labels):
+    # ---------- 增量模式：并查集连通性 + 最小支撑森林，随 add_edge 更新 ----------
+    def enable_incremental(self):
+        if self.is_directed:
+            raise ValueError("增量连通性/最小支撑森林只适用于无向图")
+        if self._dyn is None:
+            self._dyn = DynamicForest(self.num_vertices)
+            for u, nbrs in enumerate(self.adj_list):
+                for v, weight in nbrs:
+                    if u < v:  # 无向边在两端各存一次
+                        self._dyn.add(u, v, weight)
+        return self._dyn
+
+    def connected(self, u, v):
+        return self.enable_incremental().connected(u, v)
+
+    def num_components(self):
+        return self.enable_incremental().dsu.count
+
+    def spanning_forest(self):
+        # 返回 (森林边列表 [(u, v, w)], 总权值)
+        dyn = self.enable_incremental()
+        return dyn.edges(), dyn.weight
+
+    def to_csr(self):
+        g = CSRGraph.from_adj_list(self.adj_list, self.is_directed)
+        g._sorted_adj = self._sorted_adj
+        g.labels = self.labels
+        return g
+
+    def save(self, path):
+        # 二进制 CSR 文件：头部 + offsets/targets/weights（+ 标签偏移与 UTF-8 字节），各段 8 字节对齐，
+        # 由 CSRGraph.load 直接映射打开
+        g = self if isinstance(self, CSRGraph) else self.to_csr()
+        wfmt = memoryview(g.weights).format
+        labels = g.labels
+        flags = g.is_directed | g._sorted_adj << 1 | (wfmt == 'd') << 2 | (labels is not None) << 3
+        label_offsets, blob = array('q', [0]), b""
+        if labels is not None:
+            encoded = [str(x).encode("utf-8") for x in labels]
+            for b in encoded:
+                label_offsets.append(label_offsets[-1] + len(b))
+            blob = b"".join(encoded)
+        with open(path, "wb") as f:
+            f.write(CSRGraph._FILE_HEADER.pack(CSRGraph._FILE_MAGIC, g.num_vertices, len(g.targets), flags, len(blob)))
+            for arr in (g.offsets, g.targets, g.weights) + ((label_offsets,) if labels is not None else ()):
+                f.write(memoryview(arr).cast('B'))
+            f.write(blob)
+
+    def _names(self, vertex_labels=None):
+        # 未显式传入时用图自带的标签，都没有则用顶点下标
+        if vertex_labels is not None:
+            return vertex_labels
+        return self.labels if self.labels is not None else range(self.num_vertices)
+
+    def finalize(self):
+        # 一次性把各邻接表按邻点下标稳定排序，此后遍历不再逐次 sorted()，后续 add_edge 保持有序
+        if not self._sorted_adj:
+            for nbrs in self.adj_list:
+                nbrs.sort(key=_vertex_key)
+            self._sorted_adj = True
+        return self
+
+    def sorted_neighbors(self, u):
+        if self._sorted_adj:
+            return self.adj_list[u]
+        return sorted(self.adj_list[u], key=_vertex_key)
+
+    def print_adj_matrix(self, vertex_labels=None):
+        vertex_labels = self._names(vertex_labels)
         print("邻接矩阵：")
-        print("  " + " ".join(vertex_labels))
+        print("  " + " ".join(map(str, vertex_labels)))
         for i in range(self.num_vertices):
             row = [str(self.adj_matrix[i][j]) for j in range(self.num_vertices)]
             print(f"{vertex_labels[i]} " + " ".join(row))
 
-    def bfs(self, start_idx, vertex_labels):
+    def iter_bfs(self, start_idx, all_components=False):
+        # 惰性产出顶点下标，调用方可随时停止
+        visited = [False] * self.num_vertices
+        roots = [start_idx] + (list(range(self.num_vertices)) if all_components else [])
+        for root in roots:
+            if visited[root]:
+                continue
+            visited[root] = True
+            queue = deque([root])
+            while queue:
+                u = queue.popleft()
+                yield u
+                for v, _ in self.sorted_neighbors(u):
+                    if not visited[v]:
+                        visited[v] = True
+                        queue.append(v)
+
+    def iter_dfs(self, start_idx, all_components=False):
+        # 显式栈迭代实现，访问顺序与 dfs_recursive 相同，不受递归深度限制
         visited = [False] * self.num_vertices
-        queue = deque([start_idx])
-        visited[start_idx] = True
-        bfs_order = []
-
-        while queue:
-            u = queue.popleft()
-            bfs_order.append(vertex_labels[u])
-            for v, _ in sorted(self.adj_list[u], key=lambda x: x[0]):
-                if not visited[v]:
-                    visited[v] = True
-                    queue.append(v)
-        return bfs_order
-
-    def dfs_recursive(self, u, visited, dfs_order, vertex_labels):
+        roots = [start_idx] + (list(range(self.num_vertices)) if all_components else [])
+        for root in roots:
+            if visited[root]:
+                continue
+            visited[root] = True
+            yield root
+            stack = [iter(self.sorted_neighbors(root))]
+            while stack:
+                for v, _ in stack[-1]:
+                    if not visited[v]:
+                        visited[v] = True
+                        yield v
+                        stack.append(iter(self.sorted_neighbors(v)))
+                        break
+                else:
+                    stack.pop()
+
+    def bfs(self, start_idx, vertex_labels=None, all_components=False):
+        vertex_labels = self._names(vertex_labels)
+        return [vertex_labels[u] for u in self.iter_bfs(start_idx, all_components)]
+
+    def dfs_recursive(self, u, visited, dfs_order, vertex_labels=None):
+        vertex_labels = self._names(vertex_labels)
         visited[u] = True
         dfs_order.append(vertex_labels[u])
-        for v, _ in sorted(self.adj_list[u], key=lambda x: x[0]):
+        for v, _ in self.sorted_neighbors(u):
             if not visited[v]:
                 self.dfs_recursive(v, visited, dfs_order, vertex_labels)
 
-    def dfs(self, start_idx, vertex_labels):
-        visited = [False] * self.num_vertices
-        dfs_order = []
-        self.dfs_recursive(start_idx, visited, dfs_order, vertex_labels)
-        return dfs_order
+    def dfs(self, start_idx, vertex_labels=None, all_components=False):
+        vertex_labels = self._names(vertex_labels)
+        return [vertex_labels[u] for u in self.iter_dfs(start_idx, all_components)]
+
+    def dijkstra(self, start_idx, vertex_labels=None):
+        vertex_labels = self._names(vertex_labels)
+        dist = self._dijkstra_scan(start_idx)
+        INF = float('inf')
+        print("\nDijkstra最短路径（起点：{}）：".format(vertex_labels[start_idx]))
+        for i in range(self.num_vertices):
+            if dist[i] == INF:
+                print(f"{vertex_labels[start_idx]} -> {vertex_labels[i]}: 不可达")
+            else:
+                print(f"{vertex_labels[start_idx]} -> {vertex_labels[i]}: {dist[i]}")
+        return dist
 
-    def dijkstra(self, start_idx, vertex_labels):
+    def _dijkstra_scan(self, start_idx):
+        # O(V^2) 扫描版计算部分，不打印
         INF = float('inf')
         dist = [INF] * self.num_vertices
         dist[start_idx] = 0
         visited = [False] * self.num_vertices
+        rounds = relax = 0
 
         for _ in range(self.num_vertices):
+            rounds += 1
             min_dist = INF
             u = -1
             for i in range(self.num_vertices):
@@ -69,16 +424,14 @@ class Graph:
             for v, weight in self.adj_list[u]:
                 if not visited[v] and dist[u] + weight < dist[v]:
                     dist[v] = dist[u] + weight
-
-        print("\nDijkstra最短路径（起点：{}）：".format(vertex_labels[start_idx]))
-        for i in range(self.num_vertices):
-            if dist[i] == INF:
-                print(f"{vertex_labels[start_idx]} -> {vertex_labels[i]}: 不可达")
-            else:
-                print(f"{vertex_labels[start_idx]} -> {vertex_labels[i]}: {dist[i]}")
+                    relax += 1
+        if PROBE.enabled:   # 计数在局部变量中累计，出口一次性写入
+            PROBE.add("graph.dijkstra.scan", rounds * self.num_vertices)
+            PROBE.add("graph.dijkstra.relax", relax)
         return dist
 
-    def prim(self, start_idx, vertex_labels):
+    def prim(self, start_idx, vertex_labels=None):
+        vertex_labels = self._names(vertex_labels)
         INF = float('inf')
         key = [INF] * self.num_vertices 
         parent = [-1] * self.num_vertices
@@ -109,56 +462,342 @@ class Graph:
                 mst_weight += key[i]
         print(f"MST总权值：{mst_weight}")
         return parent, mst_weight
-    def tarjan_bcc(self, start_idx, vertex_labels):
-        visited = [False] * self.num_vertices
-        disc = [0] * self.num_vertices
-        low = [0] * self.num_vertices
+
+    def dijkstra_heap(self, start_idx, heap="binary"):
+        # O((V+E) log V)，返回 (dist, pred)，pred 为最短路树前驱数组（-1 表示无）
+        INF = float('inf')
+        dist = [INF] * self.num_vertices
+        pred = [-1] * self.num_vertices
+        done = [False] * self.num_vertices
+        dist[start_idx] = 0
+        pq = HEAPS[heap]()
+        pq.push(0, start_idx)
+        pops = relax = 0
+        while pq:
+            d, u = pq.pop()
+            pops += 1
+            if done[u]:
+                continue
+            done[u] = True
+            for v, weight in self.adj_list[u]:
+                nd = d + weight
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    pq.push(nd, v)
+                    relax += 1
+        if PROBE.enabled:
+            PROBE.add("graph.dijkstra.relax", relax)
+            PROBE.add("graph.dijkstra.heap_push", relax + 1)
+            PROBE.add("graph.dijkstra.heap_pop", pops)
+        return dist, pred
+
+    def prim_heap(self, start_idx, heap="binary"):
+        # O((V+E) log V)，返回 (parent, mst_weight)，与 prim 相同
+        if heap == "radix":
+            raise ValueError("radix 堆要求键单调，不适用于 Prim")
+        INF = float('inf')
+        key = [INF] * self.num_vertices
         parent = [-1] * self.num_vertices
+        visited = [False] * self.num_vertices
+        key[start_idx] = 0
+        pq = HEAPS[heap]()
+        pq.push(0, start_idx)
+        mst_weight = 0
+        while pq:
+            k, u = pq.pop()
+            if visited[u]:
+                continue
+            visited[u] = True
+            mst_weight += k
+            for v, weight in self.adj_list[u]:
+                if not visited[v] and weight < key[v]:
+                    key[v] = weight
+                    parent[v] = u
+                    pq.push(weight, v)
+        return parent, mst_weight
+
+    def distance_table(self, sources=None, workers=None, out_path=None, chunk_size=16):
+        # 多源最短路：sources 为 None 时求全源。结果为 len(sources)×V 的 float64 矩阵（行序同 sources），
+        # 以 memoryview 返回（m[i, v]）；给出 out_path 时逐行写入该文件并返回其只读映射。
+        # 图以 CSR 放入共享内存，各进程只挂载一次；结果由工作进程直接写入共享内存/映射文件，不经 pickle 回传。
+        sources = list(range(self.num_vertices) if sources is None else sources)
+        g = self if isinstance(self, CSRGraph) else self.to_csr()
+        n, k = g.num_vertices, len(sources)
+        workers = workers or os.cpu_count() or 1
+        nbytes = k * n * 8
+        if nbytes == 0:
+            if out_path is not None:
+                open(out_path, "wb").close()
+            return memoryview(array('d'))      # 无源：空结果（memoryview 不支持含 0 的形状）
+        blocks = []
+        try:
+            spec = {"n": n, "directed": g.is_directed, "arrays": [], "cells": k * n}
+            for arr in (g.offsets, g.targets, g.weights):
+                mv = memoryview(arr)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, mv.nbytes))
+                blocks.append(shm)
+                shm.buf[:mv.nbytes] = mv.cast('B')
+                spec["arrays"].append((shm.name, mv.format, len(mv)))
+            if out_path is None:
+                res = shared_memory.SharedMemory(create=True, size=nbytes)
+                blocks.append(res)
+                spec["result"] = ("shm", res.name)
+            else:
+                with open(out_path, "wb") as f:
+                    f.truncate(nbytes)
+                spec["result"] = ("file", out_path)
+            tasks = [(i, sources[i:i + chunk_size]) for i in range(0, k, chunk_size)]
+            if workers <= 1 or len(tasks) <= 1:
+                _dist_worker_init(spec)
+                for t in tasks:
+                    _dist_worker(t)
+                _dist_worker_close()
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_dist_worker_init,
+                                         initargs=(spec,)) as pool:
+                    for _ in pool.map(_dist_worker, tasks):
+                        pass
+            if out_path is None:
+                out = array('d')    # 直接从共享块拷一次，不经中间 bytes
+                with res.buf[:nbytes] as mv:
+                    out.frombytes(mv)
+                return memoryview(out).cast('B').cast('d', (k, n))
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        with open(out_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mm).cast('d', (k, n))
+
+    # ---------- 点对点查询：提前终止 / 双向 Dijkstra / ALT（A* + 路标三角不等式） ----------
+    def reverse_graph(self):
+        if not self.is_directed:
+            return self
+        if self._rev is None:
+            rev = Graph(self.num_vertices, is_directed=True)
+            for u, nbrs in enumerate(self.adj_list):
+                for v, weight in nbrs:
+                    rev.adj_list[v].append((u, weight))
+            self._rev = rev
+        return self._rev
+
+    def shortest_path(self, source, target, method="bidirectional"):
+        # 返回 (距离, 顶点路径)；不可达时 (inf, [])。各方法只访问必要的顶点，状态用字典保存
+        if method == "dijkstra":
+            return self._p2p_astar(source, target, None)
+        if method == "alt":
+            if self._landmarks is None:
+                raise ValueError("请先调用 prepare_landmarks 或 load_landmarks")
+            return self._p2p_astar(source, target, self._alt_heuristic(target))
+        if method == "bidirectional":
+            return self._p2p_bidirectional(source, target)
+        raise ValueError(f"未知方法: {method}")
+
+    def _p2p_astar(self, source, target, h):
+        # h 为 None 时即带提前终止的 Dijkstra；h 一致（ALT 满足）时每个顶点只出堆一次
+        dist, pred, done = {source: 0}, {source: -1}, set()
+        pq = [(h(source) if h else 0, source)]
+        adj = self.adj_list
+        while pq:
+            _, u = heapq.heappop(pq)
+            if u in done:
+                continue
+            if u == target:
+                return dist[u], self._walk(pred, u)[::-1]
+            done.add(u)
+            du = dist[u]
+            for v, weight in adj[u]:
+                nd = du + weight
+                if nd < dist.get(v, float('inf')):
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(pq, (nd + h(v) if h else nd, v))
+        return float('inf'), []
+
+    def _p2p_bidirectional(self, source, target):
+        INF = float('inf')
+        if source == target:
+            return 0, [source]
+        adjs = (self.adj_list, self.reverse_graph().adj_list)
+        dist = ({source: 0}, {target: 0})
+        pred = ({source: -1}, {target: -1})
+        done = (set(), set())
+        pqs = ([(0, source)], [(0, target)])
+        best, meet = INF, -1
+        while pqs[0] and pqs[1]:
+            # 两侧堆顶之和不小于当前最优时，不可能再有更短路径
+            if pqs[0][0][0] + pqs[1][0][0] >= best:
+                break
+            side = 0 if pqs[0][0][0] <= pqs[1][0][0] else 1
+            d, u = heapq.heappop(pqs[side])
+            if u in done[side]:
+                continue
+            done[side].add(u)
+            mine, other = dist[side], dist[1 - side]
+            for v, weight in adjs[side][u]:
+                nd = d + weight
+                if nd < mine.get(v, INF):
+                    mine[v] = nd
+                    pred[side][v] = u
+                    heapq.heappush(pqs[side], (nd, v))
+                if v in other and nd + other[v] < best:
+                    best, meet = nd + other[v], v
+        if meet == -1:
+            return INF, []
+        return best, self._walk(pred[0], meet)[::-1] + self._walk(pred[1], meet)[1:]
+
+    @staticmethod
+    def _walk(pred, v):
+        path = []
+        while v != -1:
+            path.append(v)
+            v = pred[v]
+        return path
+
+    def prepare_landmarks(self, k=8, seed=0):
+        # 最远点法选路标：每次取到已选路标最小距离最大的可达顶点
+        rng = random.Random(seed)
+        rev = self.reverse_graph()
+        n = self.num_vertices
+        ids, dist_from, dist_to = [], [], []
+        near = [float('inf')] * n
+        cur = rng.randrange(n)
+        for _ in range(min(k, n)):
+            ids.append(cur)
+            d_from = array('d', self.dijkstra_heap(cur)[0])
+            d_to = d_from if rev is self else array('d', rev.dijkstra_heap(cur)[0])
+            dist_from.append(d_from)
+            dist_to.append(d_to)
+            for v in range(n):
+                if d_from[v] < near[v]:
+                    near[v] = d_from[v]
+            cur = max((v for v in range(n) if near[v] != float('inf')), key=near.__getitem__)
+            if near[cur] == 0:
+                break
+        self._landmarks = (ids, dist_from, dist_to)
+        return ids
+
+    def _alt_heuristic(self, target):
+        # h(v) = max_L max(d(L,t) - d(L,v), d(v,L) - d(t,L))；任一项不可达则跳过该路标
+        INF = float('inf')
+        pairs = [(f, f[target], t, t[target]) for _, f, t in zip(*self._landmarks)
+                 if f[target] != INF or t[target] != INF]
+
+        def h(v):
+            best = 0
+            for f, ft, to, tt in pairs:
+                if ft != INF and f[v] != INF and ft - f[v] > best:
+                    best = ft - f[v]
+                if tt != INF and to[v] != INF and to[v] - tt > best:
+                    best = to[v] - tt
+            return best
+        return h
+
+    _LANDMARK_HEADER = struct.Struct("<4sqq?")
+
+    def save_landmarks(self, path):
+        # 二进制：头部(魔数, 路标数, 顶点数, 是否有向) + 路标编号 + 各路标 dist_from/dist_to 行（float64）
+        ids, dist_from, dist_to = self._landmarks
+        with open(path, "wb") as f:
+            f.write(self._LANDMARK_HEADER.pack(b"LMK1", len(ids), self.num_vertices, self.is_directed))
+            array('q', ids).tofile(f)
+            for row in dist_from + (dist_to if self.is_directed else []):
+                row.tofile(f)
+
+    def load_landmarks(self, path):
+        with open(path, "rb") as f:
+            magic, k, n, directed = self._LANDMARK_HEADER.unpack(f.read(self._LANDMARK_HEADER.size))
+            if magic != b"LMK1" or n != self.num_vertices or directed != self.is_directed:
+                raise ValueError("路标文件与当前图不匹配")
+            ids = array('q')
+            ids.fromfile(f, k)
+            rows = []
+            for _ in range(2 * k if directed else k):
+                row = array('d')
+                row.fromfile(f, n)
+                rows.append(row)
+        self._landmarks = (list(ids), rows[:k], rows[k:] if directed else rows[:k])
+        return list(ids)
+
+    @staticmethod
+    def path_to(pred, target):
+        # 由前驱数组回溯起点到 target 的路径（顶点下标列表）
+        path = []
+        while target != -1:
+            path.append(target)
+            target = pred[target]
+        return path[::-1]
+    def _tarjan(self, roots):
+        # 显式栈模拟递归版 Tarjan：帧为 [u, 邻接迭代器, 孩子数]，子帧出栈时执行递归返回后的逻辑
+        n = self.num_vertices
+        visited = [False] * n
+        disc = [0] * n
+        low = [0] * n
+        parent = [-1] * n
         articulation_points = set()
-        bcc = []  
-        stack = []  
+        bcc = []
+        stack = []
         time = 0
 
-        def dfs(u):
-            nonlocal time
-            children = 0
-            visited[u] = True
-            disc[u] = low[u] = time
-            time += 1
-
-            for v, _ in self.adj_list[u]:
-                if not visited[v]:
-                    parent[v] = u
-                    children += 1
-                    stack.append((u, v))
-                    dfs(v)
+        def pop_component(u, v):
+            component = []
+            while stack[-1] != (u, v):
+                component.append(stack.pop())
+            component.append(stack.pop())
+            bcc.append(component)
 
+        for root in roots:
+            if visited[root]:
+                continue
+            visited[root] = True
+            disc[root] = low[root] = time
+            time += 1
+            frames = [[root, iter(self.adj_list[root]), 0]]
+            while frames:
+                frame = frames[-1]
+                u = frame[0]
+                for v, _ in frame[1]:
+                    if not visited[v]:
+                        parent[v] = u
+                        frame[2] += 1
+                        stack.append((u, v))
+                        visited[v] = True
+                        disc[v] = low[v] = time
+                        time += 1
+                        frames.append([v, iter(self.adj_list[v]), 0])
+                        break
+                    elif v != parent[u] and disc[v] < disc[u]:
+                        stack.append((u, v))
+                        low[u] = min(low[u], disc[v])
+                else:
+                    frames.pop()
+                    if not frames:
+                        break
+                    v = u
+                    u, children = frames[-1][0], frames[-1][2]
                     # 更新low[u]
                     low[u] = min(low[u], low[v])
                     if parent[u] == -1 and children > 1:
                         articulation_points.add(u)
-                        component = []
-                        while stack[-1] != (u, v):
-                            component.append(stack.pop())
-                        component.append(stack.pop())
-                        bcc.append(component)
-
+                        pop_component(u, v)
                     if parent[u] != -1 and low[v] >= disc[u]:
                         articulation_points.add(u)
-                        component = []
-                        while stack[-1] != (u, v):
-                            component.append(stack.pop())
-                        component.append(stack.pop())
-                        bcc.append(component)
+                        pop_component(u, v)
+            if stack:
+                bcc.append(stack.copy())
+                stack.clear()
+        return bcc, articulation_points
 
-                elif v != parent[u] and disc[v] < disc[u]: 
-                    stack.append((u, v))
-                    low[u] = min(low[u], disc[v])
+    def biconnected_components(self, start_idx=None):
+        # 不打印；start_idx 为 None 时一趟覆盖所有连通分量
+        roots = range(self.num_vertices) if start_idx is None else [start_idx]
+        return self._tarjan(roots)
 
-        dfs(start_idx)
-        if stack:
-            bcc.append(stack.copy())
-            stack.clear()
+    def tarjan_bcc(self, start_idx, vertex_labels=None):
+        vertex_labels = self._names(vertex_labels)
+        bcc, articulation_points = self._tarjan([start_idx])
 
         print(f"\n起点{vertex_labels[start_idx]}的双连通分量（BCC）：")
         for i, component in enumerate(bcc, 1):
@@ -171,9 +810,539 @@ class Graph:
 
         return bcc, articulation_points
 
-if __name__ == "__main__":
+
+class _CSRRow:
+    # 顶点 u 的出边视图：只持有 targets/weights 的该段切片，迭代时逐个产出 (v, weight)，不建元组列表
+    __slots__ = ("_t", "_w")
+
+    def __init__(self, t, w):
+        self._t, self._w = t, w
+
+    def __len__(self):
+        return len(self._t)
+
+    def __iter__(self):
+        return zip(self._t, self._w)
+
+
+class _CSRAdjacency:
+    # 让 CSRGraph.adj_list[u] 与邻接表一样可迭代得到 (v, weight)，Graph 的各算法无需改动
+    __slots__ = ("_offsets", "_targets", "_weights")
+
+    def __init__(self, offsets, targets, weights):
+        self._offsets, self._targets, self._weights = offsets, targets, weights
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, u):
+        lo, hi = self._offsets[u], self._offsets[u + 1]
+        return _CSRRow(self._targets[lo:hi], self._weights[lo:hi])
+
+    def __iter__(self):
+        return (self[u] for u in range(len(self)))
+
+
+class _PackedLabels:
+    # save() 写出的标签：偏移数组 + UTF-8 字节串（均为映射视图），按需解码单个标签
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets, blob):
+        self._offsets, self._blob = offsets, blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        n = len(self._offsets) - 1
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("标签下标越界")
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class CSRGraph(Graph):
+    # 压缩稀疏行：顶点 u 的出边为 targets/weights[offsets[u]:offsets[u+1]]，三者均为连续数组
+    # 只读，批量构建；无向图每条边存两个方向
+    _FILE_MAGIC = b"CSRG\x00\x00\x00\x01"
+    _FILE_HEADER = struct.Struct("<8sqqqq")  # 魔数, 顶点数, 邻接项数, 标志位, 标签字节数
+
+    def __init__(self, num_vertices, offsets, targets, weights, is_directed=False, labels=None):
+        if len(offsets) != num_vertices + 1 or not len(targets) == len(weights) == offsets[-1]:
+            raise ValueError("CSR 数组长度不一致")
+        self._init_state(num_vertices, is_directed, labels)
+        self.offsets, self.targets, self.weights = offsets, targets, weights
+        self.adj_list = _CSRAdjacency(offsets, targets, weights)
+
+    @property
+    def num_edges(self):
+        return len(self.targets) if self.is_directed else len(self.targets) // 2
+
+    def add_edge(self, u, v, weight=1):
+        raise TypeError("CSRGraph 为只读结构，请用 from_edges 重新构建")
+
+    def neighbors(self, u):
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        return self.targets[lo:hi]
+
+    def finalize(self):
+        if not self._sorted_adj:
+            t, w = self.targets, self.weights
+            for u in range(self.num_vertices):
+                lo, hi = self.offsets[u], self.offsets[u + 1]
+                if hi - lo > 1:
+                    seg = sorted(zip(t[lo:hi], w[lo:hi]), key=_vertex_key)
+                    t[lo:hi] = array(t.typecode, [v for v, _ in seg])
+                    w[lo:hi] = array(w.typecode, [x for _, x in seg])
+            self._sorted_adj = True
+        return self
+
+    @staticmethod
+    def _weight_array(values):
+        try:
+            return array('q', values)
+        except TypeError:  # 含浮点权值
+            return array('d', values)
+
+    @classmethod
+    def from_edges(cls, num_vertices, edges, is_directed=False, labels=None):
+        us, vs, ws = array('q'), array('q'), []
+        for e in edges:
+            us.append(e[0])
+            vs.append(e[1])
+            ws.append(e[2] if len(e) > 2 else 1)
+        return cls._from_arrays(num_vertices, us, vs, cls._weight_array(ws), is_directed, labels)
+
+    @classmethod
+    def _from_arrays(cls, num_vertices, us, vs, ws, is_directed=False, labels=None):
+        # 计数排序两趟构建：先统计出度得 offsets，再按边的原顺序填入，邻接顺序与逐条 add_edge 一致
+        m = len(us)
+        if np is not None and m:
+            src, dst = np.frombuffer(us, np.int64), np.frombuffer(vs, np.int64)
+            w = np.frombuffer(ws, np.float64 if ws.typecode == 'd' else np.int64)
+            if min(src.min(), dst.min()) < 0 or max(src.max(), dst.max()) >= num_vertices:
+                raise ValueError("顶点下标越界")
+            if not is_directed:
+                # 正反两个方向按边序交错排列，稳定排序后与逐条 add_edge 的邻接顺序相同
+                src, dst = np.stack((src, dst), 1).ravel(), np.stack((dst, src), 1).ravel()
+                w = np.repeat(w, 2)
+            total = len(src)
+            if num_vertices * total < 2 ** 63:
+                # 键 src*total + 边序唯一，普通排序即得稳定顺序，比间接的 argsort(stable) 快一个数量级
+                order = src * total
+                order += np.arange(total)
+                order.sort()
+                order %= total
+            else:
+                order = np.argsort(src, kind="stable")
+            offsets = array('q', [0]) * (num_vertices + 1)
+            np.cumsum(np.bincount(src, minlength=num_vertices), out=np.frombuffer(offsets, np.int64)[1:])
+            del src
+            # 直接写入结果 array 的缓冲区，不经中间拷贝
+            targets, weights = array('q', [0]) * total, array(ws.typecode, [0]) * total
+            np.take(dst, order, out=np.frombuffer(targets, np.int64))
+            np.take(w, order, out=np.frombuffer(weights, w.dtype))
+            return cls(num_vertices, offsets, targets, weights, is_directed, labels)
+        if m and (min(min(us), min(vs)) < 0 or max(max(us), max(vs)) >= num_vertices):
+            raise ValueError("顶点下标越界")
+        offsets = array('q', [0]) * (num_vertices + 1)
+        for i in range(m):
+            offsets[us[i] + 1] += 1
+            if not is_directed:
+                offsets[vs[i] + 1] += 1
+        for u in range(num_vertices):
+            offsets[u + 1] += offsets[u]
+        pos = offsets[:-1]
+        total = offsets[-1]
+        targets = array('q', [0]) * total
+        weights = array(ws.typecode, [0]) * total
+        for i in range(m):
+            u, v, w = us[i], vs[i], ws[i]
+            k = pos[u]
+            targets[k], weights[k] = v, w
+            pos[u] = k + 1
+            if not is_directed:
+                k = pos[v]
+                targets[k], weights[k] = u, w
+                pos[v] = k + 1
+        return cls(num_vertices, offsets, targets, weights, is_directed, labels)
+
+    @classmethod
+    def from_adj_list(cls, adj_list, is_directed=False):
+        offsets = array('q', [0])
+        targets, ws = array('q'), []
+        for nbrs in adj_list:
+            for v, w in nbrs:
+                targets.append(v)
+                ws.append(w)
+            offsets.append(len(targets))
+        return cls(len(adj_list), offsets, targets, cls._weight_array(ws), is_directed)
+
+    @classmethod
+    def from_file(cls, path, num_vertices=None, is_directed=False, labels=None, block_size=1 << 22):
+        # 文本边表：每行 "u v [w]"，# 之后为注释（整行或行尾）；未给出顶点数时取最大下标 + 1
+        # 按块整批解析到连续数组，不为每条边建元组；出现小数/指数记法时权值转为 float64
+        us, vs, ws = array('q'), array('q'), array('q')
+        ncols = None
+        with open(path, "rb") as f:
+            for block in cls._line_blocks(f, block_size):
+                if b"#" in block:
+                    block = b"\n".join(line.split(b"#", 1)[0] for line in block.split(b"\n"))
+                if not block.strip():
+                    continue
+                if ncols is None:
+                    first = next((line.split() for line in block.split(b"\n") if line.strip()), None)
+                    if first is None:
+                        continue
+                    ncols = len(first)
+                    if ncols not in (2, 3):
+                        raise ValueError("边表每行应为 u v [w]")
+                if ncols == 3 and ws.typecode == 'q' and any(c in block for c in (b".", b"e", b"E", b"n")):
+                    ws = array('d', ws)
+                if np is not None:
+                    flat = np.fromstring(block, ws.typecode, sep=" ")  # C 层解析，不生成逐个 token
+                else:
+                    flat = array(ws.typecode, map(float if ws.typecode == 'd' else int, block.split()))
+                if len(flat) % ncols:
+                    raise ValueError("边表各行列数不一致")
+                cls._append_column(us, flat[0::ncols])
+                cls._append_column(vs, flat[1::ncols])
+                if ncols == 3:
+                    cls._append_column(ws, flat[2::3])
+                else:
+                    ws.extend(array('q', [1]) * (len(flat) // 2))
+        if num_vertices is None:
+            num_vertices = 1 + max(max(us, default=-1), max(vs, default=-1))
+        return cls._from_arrays(num_vertices, us, vs, ws, is_directed, labels)
+
+    @staticmethod
+    def _append_column(dst, col):
+        # col 为 array 或 numpy 数组，按 dst 的类型追加（浮点解析出的顶点下标转回整数）
+        if np is not None and isinstance(col, np.ndarray):
+            dst.frombytes(memoryview(col.astype(dst.typecode)).cast('B'))
+        elif col.typecode == dst.typecode:
+            dst.extend(col)
+        else:
+            dst.extend(array(dst.typecode, map(int, col)))
+
+    @staticmethod
+    def _line_blocks(f, block_size):
+        # 按块读取，块边界对齐到换行，不截断行
+        tail = b""
+        while True:
+            chunk = f.read(block_size)
+            if not chunk:
+                if tail:
+                    yield tail
+                return
+            chunk = tail + chunk
+            cut = chunk.rfind(b"\n") + 1
+            if cut:
+                yield chunk[:cut]
+            tail = chunk[cut:]
+
+    @classmethod
+    def load(cls, path):
+        # 只读映射打开 save() 写出的文件：各数组直接是文件页上的 memoryview，不解析、不拷贝
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, slots, flags, nblob = cls._FILE_HEADER.unpack_from(mm)
+        if magic != cls._FILE_MAGIC:
+            raise ValueError("不是 CSR 图文件")
+        mv = memoryview(mm)
+        pos = cls._FILE_HEADER.size
+
+        def take(fmt, count):
+            nonlocal pos
+            view = mv[pos:pos + 8 * count].cast(fmt) if count else array(fmt)  # 空视图不能 cast
+            pos += 8 * count
+            return view
+
+        offsets, targets = take('q', n + 1), take('q', slots)
+        weights = take('d' if flags & 4 else 'q', slots)
+        labels = _PackedLabels(take('q', n + 1), mv[pos:pos + nblob]) if flags & 8 else None
+        g = cls(n, offsets, targets, weights, bool(flags & 1), labels)
+        g._sorted_adj = bool(flags & 2)
+        return g
+
+
+# ---------- distance_table 的工作进程：挂载共享 CSR，逐源求最短路并把整行写入结果缓冲 ----------
+_WORKER = {}
+
+
+def _dist_worker_init(spec):
+    views, blocks = [], []
+    for name, fmt, length in spec["arrays"]:
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        views.append(shm.buf.cast(fmt)[:length] if length else array(fmt))
+    kind, where = spec["result"]
+    if kind == "shm":
+        out_block = shared_memory.SharedMemory(name=where)
+        blocks.append(out_block)
+        out = out_block.buf
+    else:
+        with open(where, "r+b") as f:
+            out = mmap.mmap(f.fileno(), 0)
+        blocks.append(out)
+    _WORKER.update(graph=CSRGraph(spec["n"], *views, is_directed=spec["directed"]),
+                   out=memoryview(out)[:spec["cells"] * 8].cast('d'), blocks=blocks, views=views)
+
+
+def _dist_worker(task):
+    row, sources = task
+    g, out = _WORKER["graph"], _WORKER["out"]
+    n = g.num_vertices
+    for i, s in enumerate(sources, row):
+        dist, _ = g.dijkstra_heap(s)
+        out[i * n:(i + 1) * n] = array('d', dist)
+    return len(sources)
+
+
+def _dist_worker_close():
+    # 同进程执行时需先释放全部视图，共享内存块才能关闭
+    _WORKER["out"].release()
+    for v in _WORKER["views"]:
+        if isinstance(v, memoryview):
+            v.release()
+    del _WORKER["graph"]
+    for b in _WORKER.pop("blocks"):
+        if isinstance(b, mmap.mmap):
+            b.flush()
+        b.close()
+    _WORKER.clear()
+
+
+def random_sparse_edges(num_vertices, avg_degree=4, max_weight=100, seed=0):
+    # 先连一条随机生成树保证连通，再补随机边，整数权值
+    rng = random.Random(seed)
+    order = list(range(num_vertices))
+    rng.shuffle(order)
+    edges = [(order[rng.randrange(i)], order[i], rng.randint(1, max_weight)) for i in range(1, num_vertices)]
+    for _ in range(num_vertices * (avg_degree - 2) // 2):
+        edges.append((rng.randrange(num_vertices), rng.randrange(num_vertices), rng.randint(1, max_weight)))
+    return edges
+
+
+def grid_edges(rows, cols, max_weight=100, seed=0):
+    # 四邻接网格，随机整数权值
+    rng = random.Random(seed)
+    edges = []
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c
+            if c + 1 < cols:
+                edges.append((u, u + 1, rng.randint(1, max_weight)))
+            if r + 1 < rows:
+                edges.append((u, u + cols, rng.randint(1, max_weight)))
+    return edges
+
+
+def random_sparse_graph(num_vertices, avg_degree=4, max_weight=100, seed=0, csr=False):
+    edges = random_sparse_edges(num_vertices, avg_degree, max_weight, seed)
+    if csr:
+        return CSRGraph.from_edges(num_vertices, edges)
+    g = Graph(num_vertices)
+    for u, v, w in edges:
+        g.add_edge(u, v, w)
+    return g
+
+
+SCAN_LIMIT = 10000  # 扫描版 O(V^2)，超过此规模跳过
+
+
+def bench_heaps(sizes=None, csr=False):
+    sizes = sizes or [1000, 5000, 10000, 100000, 1000000]
+    print("规模对比：扫描版 vs 堆版 Dijkstra / Prim（秒）" + ("，CSR 存储" if csr else ""))
+    for n in sizes:
+        g = random_sparse_graph(n, csr=csr)
+        labels = [str(i) for i in range(n)]
+        row = []
+        if n <= SCAN_LIMIT:
+            with redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                dist = g.dijkstra(0, labels)
+                t1 = time.perf_counter()
+                _, w_scan = g.prim(0, labels)
+                t2 = time.perf_counter()
+            row.append(f"scan: dijkstra {t1 - t0:.3f} prim {t2 - t1:.3f}")
+        for name in HEAPS:
+            t0 = time.perf_counter()
+            d, _ = g.dijkstra_heap(0, name)
+            t1 = time.perf_counter()
+            if name == "radix":
+                row.append(f"{name}: dijkstra {t1 - t0:.3f}")
+                continue
+            _, w = g.prim_heap(0, name)
+            t2 = time.perf_counter()
+            if n <= SCAN_LIMIT:
+                assert d == dist and w == w_scan
+            row.append(f"{name}: dijkstra {t1 - t0:.3f} prim {t2 - t1:.3f}")
+        print(f"V={n:>8}  " + "  |  ".join(row))
+
+
+def bench_csr(sizes=None):
+    bench_heaps(sizes, csr=True)
+
+
+def stress_deep(sizes=None):
+    # 长路径图上的迭代 DFS / Tarjan：递归版在几千层即超出递归上限
+    sizes = sizes or [10 ** 6]
+    for n in sizes:
+        g = CSRGraph.from_edges(n, [(i, i + 1) for i in range(n - 1)])
+        labels = range(n)
+        t0 = time.perf_counter()
+        order = g.dfs(0, labels)
+        t1 = time.perf_counter()
+        bcc, aps = g.biconnected_components()
+        t2 = time.perf_counter()
+        assert order == list(range(n))
+        assert len(bcc) == n - 1 and all(len(c) == 1 for c in bcc)
+        assert aps == set(range(1, n - 1))
+        print(f"路径图 V={n}: DFS {t1 - t0:.2f}s  BCC {t2 - t1:.2f}s  BCC数 {len(bcc)}  关节点数 {len(aps)}")
+
+
+def bench_multi_source(sizes=None, num_sources=64):
+    # 多源距离表：单进程 vs 进程池
+    sizes = sizes or [10000, 100000]
+    for n in sizes:
+        g = random_sparse_graph(n, csr=True)
+        sources = list(range(0, n, max(1, n // num_sources)))[:num_sources]
+        t0 = time.perf_counter()
+        a = g.distance_table(sources, workers=1)
+        t1 = time.perf_counter()
+        b = g.distance_table(sources)
+        t2 = time.perf_counter()
+        assert a.tolist() == b.tolist()
+        print(f"V={n:>8} 源数={len(sources)}: 单进程 {t1 - t0:.2f}s  进程池({os.cpu_count()}) {t2 - t1:.2f}s")
+
+
+def bench_p2p(sizes=None, queries=100, num_landmarks=8):
+    # 点对点查询延迟分位数：整图 Dijkstra vs 提前终止 / 双向 / ALT
+    sizes = sizes or [100000]
+    rng = random.Random(1)
+
+    def pct(xs, q):
+        xs = sorted(xs)
+        return xs[min(len(xs) - 1, int(q * len(xs)))] * 1000
+
+    for n in sizes:
+        side = int(n ** 0.5)
+        for name, g in [("random", random_sparse_graph(n, csr=True)),
+                        ("grid", CSRGraph.from_edges(side * side, grid_edges(side, side)))]:
+            t0 = time.perf_counter()
+            g.prepare_landmarks(num_landmarks)
+            print(f"{name} V={g.num_vertices}: 路标预处理 {time.perf_counter() - t0:.1f}s")
+            pairs = [(rng.randrange(g.num_vertices), rng.randrange(g.num_vertices)) for _ in range(queries)]
+            lat = {"full": [], "dijkstra": [], "bidirectional": [], "alt": []}
+            for s, t in pairs:
+                t0 = time.perf_counter()
+                ref = g.dijkstra_heap(s)[0][t]
+                lat["full"].append(time.perf_counter() - t0)
+                for m in ("dijkstra", "bidirectional", "alt"):
+                    t0 = time.perf_counter()
+                    d, _ = g.shortest_path(s, t, m)
+                    lat[m].append(time.perf_counter() - t0)
+                    assert d == ref
+            for m, xs in lat.items():
+                print(f"  {m:>13}: p50 {pct(xs, .5):8.2f}ms  p90 {pct(xs, .9):8.2f}ms  p99 {pct(xs, .99):8.2f}ms")
+
+
+def kruskal_weight(num_vertices, edges):
+    # 全量重算：排序 + 并查集
+    dsu = DisjointSet(num_vertices)
+    return sum(w for u, v, w in sorted(edges, key=itemgetter(2)) if dsu.union(u, v))
+
+
+def bench_incremental(sizes=None, edges_per_vertex=10, batches=10, queries=100000):
+    # 流式加入 V*edges_per_vertex 条随机边（默认 10^6）：增量维护 vs 每批后全量重算（Kruskal）
+    for n in sizes or [100000]:
+        m = n * edges_per_vertex
+        rng = random.Random(0)
+        edges = [(rng.randrange(n), rng.randrange(n), rng.randint(1, 100)) for _ in range(m)]
+        g = Graph(n)
+        g.enable_incremental()
+        step = m // batches
+        t_inc = t_full = 0
+        for b in range(batches):
+            chunk = edges[b * step:(b + 1) * step]
+            t0 = time.perf_counter()
+            for u, v, w in chunk:
+                g.add_edge(u, v, w)
+            t_inc += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            ref = kruskal_weight(n, edges[:(b + 1) * step])
+            t_last = time.perf_counter() - t0
+            t_full += t_last
+            _, weight = g.spanning_forest()
+            assert weight == ref
+            print(f"V={n} 已加入 {(b + 1) * step} 条边：分量 {g.num_components()}，森林权值 {weight}，"
+                  f"增量累计 {t_inc:.2f}s，本次全量重算 {t_last:.2f}s，每批重算累计 {t_full:.2f}s")
+        # 全量重算一次的耗时可摊给多少条增量边：结果需要比这更频繁地刷新时，增量模式更快
+        print(f"增量 {t_inc / m * 1e6:.1f}µs/边；盈亏平衡刷新间隔 ≈ {t_last / (t_inc / m):.0f} 条边")
+        pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+        t0 = time.perf_counter()
+        for u, v in pairs:
+            g.connected(u, v)
+        print(f"连通性查询：{(time.perf_counter() - t0) / queries * 1e6:.2f}µs/次")
+
+
+def bench_load(sizes=None, avg_degree=10):
+    # 10^7 条边：逐条 add_edge（最多测 10^6 条，按比例外推） vs 文本批量加载 vs 二进制映射打开
+    import tempfile
+    import tracemalloc
+
+    def measure(name, fn):
+        t0 = time.perf_counter()
+        fn()
+        t = time.perf_counter() - t0
+        tracemalloc.start()
+        g = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {name}: {t:.3f}s，峰值内存 {peak / 2 ** 20:.1f}MB，度(0)={len(g.adj_list[0])}，标签(0)={g.labels[0]}")
+        return g
+
+    for m in sizes or [10 ** 7]:
+        n = max(1, 2 * m // avg_degree)
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as d:
+            txt, binf = os.path.join(d, "g.txt"), os.path.join(d, "g.csr")
+            with open(txt, "w") as f:
+                for lo in range(0, m, 100000):
+                    f.write("".join(f"{rng.randrange(n)} {rng.randrange(n)} {rng.randint(1, 100)}\n"
+                                    for _ in range(min(100000, m - lo))))
+            print(f"V={n} E={m}，文本 {os.path.getsize(txt) / 2 ** 20:.0f}MB")
+            k = min(m, 10 ** 6)
+            with open(txt) as f:
+                head = [tuple(map(int, next(f).split())) for _ in range(k)]
+            g = Graph(n)
+            t0 = time.perf_counter()
+            for u, v, w in head:
+                g.add_edge(u, v, w)
+            t = time.perf_counter() - t0
+            print(f"  逐条 add_edge: {t:.2f}s / {k} 条，外推 {t * m / k:.1f}s")
+            del g, head
+            labels = [f"v{i}" for i in range(n)]
+            measure("文本批量加载", lambda: CSRGraph.from_file(txt, n, labels=labels)).save(binf)
+            print(f"  二进制文件 {os.path.getsize(binf) / 2 ** 20:.0f}MB")
+            measure("二进制映射打开", lambda: CSRGraph.load(binf))
+
+
+BENCHES = {"heaps": bench_heaps, "csr": bench_csr, "deep": stress_deep, "multi": bench_multi_source,
+           "p2p": bench_p2p, "incremental": bench_incremental, "load": bench_load}
+
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # 用法: exp3.py <基准名> [规模...]；不带参数时运行下方演示
+    BENCHES[sys.argv[1]]([int(float(x)) for x in sys.argv[2:]] or None)
+elif __name__ == "__main__":
     vertex_labels1 = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-    graph1 = Graph(num_vertices=8, is_directed=False)
+    graph1 = Graph(num_vertices=8, is_directed=False, labels=vertex_labels1)
     edges1 = [
         (0,1,2), (0,2,3), (1,3,4), (1,4,12), (2,4,1), (2,7,10),
         (3,4,13), (3,5,6), (4,5,5), (4,6,14), (5,6,11), (6,7,8), (1,5,9)
@@ -184,18 +1353,22 @@ if __name__ == "__main__":
     print("="*50)
     print("图1相关结果：")
     print("="*50)
-    graph1.print_adj_matrix(vertex_labels1)
+    graph1.print_adj_matrix()
 
-    bfs_order = graph1.bfs(start_idx=0, vertex_labels=vertex_labels1)
+    bfs_order = graph1.bfs(start_idx=0)
     print("\nBFS遍历顺序（起点A）：", " -> ".join(bfs_order))
-    dfs_order = graph1.dfs(start_idx=0, vertex_labels=vertex_labels1)
+    dfs_order = graph1.dfs(start_idx=0)
     print("DFS遍历顺序（起点A）：", " -> ".join(dfs_order))
 
-    graph1.dijkstra(start_idx=0, vertex_labels=vertex_labels1)
-    graph1.prim(start_idx=0, vertex_labels=vertex_labels1)
+    graph1.dijkstra(start_idx=0)
+    graph1.prim(start_idx=0)
+
+    dist, pred = graph1.dijkstra_heap(start_idx=0, heap="pairing")
+    path = Graph.path_to(pred, 7)
+    print("\n堆优化Dijkstra A -> H 路径：", " -> ".join(graph1.labels[i] for i in path), f"（长度 {dist[7]}）")
 
     vertex_labels2 = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
-    graph2 = Graph(num_vertices=12, is_directed=False)
+    graph2 = Graph(num_vertices=12, is_directed=False, labels=vertex_labels2)
     edges2 = [
         (0,1), (0,2), (1,2), (1,3), (2,3), (3,4), (4,5), (5,6),
         (6,7), (7,8), (8,9), (9,10), (10,11)
@@ -207,6 +1380,6 @@ if __name__ == "__main__":
     print("="*50)
     start_indices2 = [0, 3, 7]  # 起点A、D、H
     for idx in start_indices2:
-        graph2.tarjan_bcc(start_idx=idx, vertex_labels=vertex_labels2)
+        graph2.tarjan_bcc(start_idx=idx)
 
         print("-"*30)
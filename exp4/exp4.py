@@ -1,5 +1,14 @@
-import random, time, math, csv, os, sys
+import random, time, math, csv, os, sys, heapq, json, statistics, tracemalloc, argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from typing import List, Tuple, Dict, Callable
+try:
+    import numpy as np
+except ImportError:     # 向量化 NMS 为可选功能，无 numpy 时只有纯 Python 版本
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from instrument import PROBE
 
 Box = Tuple[float, float, float, float, float]
 
@@ -10,6 +19,8 @@ def quick_sort(arr: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
     left  = [x for x in arr if x[0] > pivot]
     mid   = [x for x in arr if x[0] == pivot]
     right = [x for x in arr if x[0] < pivot]
+    if PROBE.enabled:
+        PROBE.add("exp4.sort.move", len(arr))
     return quick_sort(left) + mid + quick_sort(right)
 
 def merge_sort(arr: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
@@ -27,56 +38,94 @@ def _merge(left, right):
         else:
             res.append(right[j]); j += 1
     res.extend(left[i:]); res.extend(right[j:])
+    if PROBE.enabled:
+        PROBE.add("exp4.sort.move", len(res))
     return res
 
 def heap_sort(arr: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
     import heapq
     h = [(-s, i) for s, i in arr]
     heapq.heapify(h)
+    if PROBE.enabled:
+        PROBE.add("exp4.sort.heap_pop", len(h))
     return [(-s, i) for s, i in [heapq.heappop(h) for _ in range(len(h))]]
 
 def shell_sort(arr: List[Tuple[float, int]]) -> List[Tuple[float, int]]:
     a, n = arr[:], len(arr)
     gap = n // 2
+    on, moves = PROBE.enabled, 0
     while gap:
         for i in range(gap, n):
             tmp, j = a[i], i
             while j >= gap and a[j-gap][0] < tmp[0]:
                 a[j] = a[j-gap]; j -= gap
             a[j] = tmp
+            if on:
+                moves += (i-j)//gap
         gap //= 2
+    if on:
+        PROBE.add("exp4.sort.move", moves)
     return a
 
+def lazy_heap_sort(arr: List[Tuple[float, int]], score_thr: float = None):
+    # 惰性排序：先按分数阈值剪枝，再 O(n) 建堆，消费方取一个才弹一个；
+    # nms 提前停止（保留满 max_keep 个）时，剩余元素不再排序。并列分数按下标升序，与 heap_sort 相同
+    h = [(-s, i) for s, i in arr if score_thr is None or s >= score_thr]
+    heapq.heapify(h)
+    while h:
+        s, i = heapq.heappop(h)
+        if PROBE.enabled:
+            PROBE.add("exp4.sort.heap_pop")
+        yield -s, i
+
+SCORE_THR = 0.05    # 生产配置：低于该置信度的框直接丢弃
+MAX_KEEP  = 100     # 每张图最多保留的检测数
+
+def select_sort(arr: List[Tuple[float, int]]):
+    return lazy_heap_sort(arr, SCORE_THR)
+
 SORT_DICT: Dict[str, Callable] = {
     "quick": quick_sort,
     "merge": merge_sort,
     "heap":  heap_sort,
     "shell": shell_sort,
+    "lazy":  lazy_heap_sort,
+    "select": select_sort,
 }
+# run_once 中需要限制保留数的排序项（阈值剪枝 + top-K）
+SORT_MAX_KEEP: Dict[str, int] = {"select": MAX_KEEP}
 
-def random_boxes(n: int, size=500) -> List[Box]:
+def random_boxes(n: int, size=500, rng=random) -> List[Box]:
     boxes = []
     for _ in range(n):
-        x1 = random.randint(0, size-20)
-        y1 = random.randint(0, size-20)
-        w  = random.randint(20, 80)
-        h  = random.randint(20, 80)
+        x1 = rng.randint(0, size-20)
+        y1 = rng.randint(0, size-20)
+        w  = rng.randint(20, 80)
+        h  = rng.randint(20, 80)
         x2 = min(x1+w, size); y2 = min(y1+h, size)
-        boxes.append((x1, y1, x2, y2, random.random()))
+        boxes.append((x1, y1, x2, y2, rng.random()))
     return boxes
 
-def cluster_boxes(n: int, clusters=5, size=500) -> List[Box]:
+def cluster_boxes(n: int, clusters=5, size=500, rng=random) -> List[Box]:
     boxes = []
     for _ in range(n):
-        cx = random.randint(50, size-50)
-        cy = random.randint(50, size-50)
-        x1 = cx + random.randint(-30, 30)
-        y1 = cy + random.randint(-30, 30)
-        w  = random.randint(20, 60); h = random.randint(20, 60)
+        cx = rng.randint(50, size-50)
+        cy = rng.randint(50, size-50)
+        x1 = cx + rng.randint(-30, 30)
+        y1 = cy + rng.randint(-30, 30)
+        w  = rng.randint(20, 60); h = rng.randint(20, 60)
         x2 = min(x1+w, size); y2 = min(y1+h, size)
-        boxes.append((x1, y1, x2, y2, random.random()))
+        boxes.append((x1, y1, x2, y2, rng.random()))
     return boxes
 
+def _scored(scores) -> List[Tuple[float, int]]:
+    # 排序输入 (分数, 下标)；开启插桩时分数换成计数包装，各排序（含 heapq 内部）的分数比较计入 exp4.sort.compare
+    si = [(s, i) for i, s in enumerate(scores)]
+    if PROBE.enabled:
+        K = PROBE.counting("exp4.sort.compare")
+        si = [(K(s), i) for s, i in si]
+    return si
+
 def iou(a: Box, b: Box) -> float:
     x1 = max(a[0], b[0]); y1 = max(a[1], b[1])
     x2 = min(a[2], b[2]); y2 = min(a[3], b[3])
@@ -85,68 +134,503 @@ def iou(a: Box, b: Box) -> float:
     area_b = (b[2]-b[0])*(b[3]-b[1])
     return inter / (area_a+area_b-inter+1e-8)
 
-def nms(boxes: List[Box], sort_func) -> List[Box]:
+def nms(boxes: List[Box], sort_func, iou_thr: float = 0.5, max_keep: int = None) -> List[Box]:
     if not boxes:
         return []
-    si = [(boxes[i][4], i) for i in range(len(boxes))]
-    order = [idx for _, idx in sort_func(si)]
+    order = (idx for _, idx in sort_func(_scored(b[4] for b in boxes)))   # 逐个消费，惰性排序只排到用到的位置
     keep = []; suppressed = [False]*len(boxes)
+    n_sup = evals = 0
     for i in order:
         if suppressed[i]: continue
         keep.append(boxes[i])
+        if len(keep) == max_keep: break
+        evals += len(boxes)-n_sup     # 每个未被抑制的框恰好算一次 IoU
         for j in range(len(boxes)):
             if suppressed[j]: continue
-            if iou(boxes[i], boxes[j]) > 0.5:
-                suppressed[j] = True
+            if iou(boxes[i], boxes[j]) > iou_thr:
+                suppressed[j] = True; n_sup += 1
+    if PROBE.enabled:
+        PROBE.add("exp4.nms.iou", evals)
     return keep
 
+class BoxGrid:
+    # 均匀网格索引：每个框登记到它覆盖的所有格子，查询只返回空间上可能相交的框。
+    # IoU > 0 要求两框相交，而相交的两框必有公共格子，因此按格子筛选不会漏掉任何可抑制的框。
+    def __init__(self, boxes: List[Box], cell: float = None):
+        if cell is None:    # 默认取平均边长，每个框通常只占 1~4 格
+            cell = sum(max(b[2]-b[0], b[3]-b[1]) for b in boxes) / max(len(boxes), 1)
+        self.cell = cell if cell > 0 else 1.0
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, b in enumerate(boxes):
+            self.add(i, b)
+
+    def _span(self, b: Box):
+        c = self.cell
+        return (range(math.floor(b[0]/c), math.floor(b[2]/c)+1),
+                range(math.floor(b[1]/c), math.floor(b[3]/c)+1))
+
+    def add(self, i: int, b: Box):
+        xs, ys = self._span(b)
+        for gx in xs:
+            for gy in ys:
+                self.cells.setdefault((gx, gy), []).append(i)
+
+    def query(self, b: Box):
+        # 可能重复返回同一下标（框跨多格），由调用方去重
+        xs, ys = self._span(b)
+        cells = self.cells
+        for gx in xs:
+            for gy in ys:
+                yield from cells.get((gx, gy), ())
+
+def nms_grid(boxes: List[Box], sort_func, iou_thr: float = 0.5, cell: float = None,
+             max_keep: int = None) -> List[Box]:
+    # 与 nms 输出一致（iou_thr >= 0）：同样的处理顺序与 IoU 判定，只是每个保留框只与同格且相交的候选比较
+    if not boxes:
+        return []
+    order = (idx for _, idx in sort_func(_scored(b[4] for b in boxes)))
+    grid = BoxGrid(boxes, cell)
+    keep = []; suppressed = [False]*len(boxes); seen = [-1]*len(boxes)
+    evals = 0
+    for i in order:
+        if suppressed[i]: continue
+        b = boxes[i]; keep.append(b)
+        if len(keep) == max_keep: break
+        xs, ys = grid._span(b)
+        for key in ((gx, gy) for gx in xs for gy in ys):
+            bucket = grid.cells.get(key)
+            if not bucket: continue
+            for j in bucket:
+                if suppressed[j] or seen[j] == i: continue   # 跨格的框只比较一次
+                seen[j] = i
+                c = boxes[j]
+                if c[0] >= b[2] or c[2] <= b[0] or c[1] >= b[3] or c[3] <= b[1]: continue  # 不相交，IoU=0
+                evals += 1
+                if iou(b, c) > iou_thr:
+                    suppressed[j] = True
+            grid.cells[key] = [j for j in bucket if not suppressed[j]]  # 顺手剔除已抑制的框
+    if PROBE.enabled:
+        PROBE.add("exp4.nms.iou", evals)
+    return keep
+
+def _nms_keep(arr, order, iou_thr: float, max_keep: int = None) -> List[int]:
+    # arr 的前 4 列为坐标，按 order 依次处理，返回保留的行号
+    x1, y1, x2, y2 = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+    areas = (x2-x1)*(y2-y1)
+    keep = []; evals = 0
+    while len(order) and len(keep) != max_keep:
+        i, rest = order[0], order[1:]
+        keep.append(i); evals += len(rest)
+        w = np.maximum(0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w*h
+        order = rest[inter / (areas[i]+areas[rest]-inter+1e-8) <= iou_thr]
+    if PROBE.enabled:
+        PROBE.add("exp4.nms.iou", evals)
+    return keep
+
+def nms_numpy(boxes, sort_func=None, iou_thr: float = 0.5, max_keep: int = None):
+    # boxes 为 Box 列表或 N×5 数组 [x1, y1, x2, y2, score]；面积只算一次，
+    # 每个保留框与剩余候选的 IoU 一次向量化算完，IoU > iou_thr 的候选从候选序列中剔除。
+    # IoU 公式与运算顺序同 iou()，给定相同 sort_func 时输出与 nms 一致；sort_func 为 None 时按分数稳定降序
+    arr = np.asarray(boxes, dtype=np.float64).reshape(-1, 5)
+    if not len(arr):
+        return boxes[:0]
+    scores = arr[:, 4]
+    if sort_func is None:
+        order = np.argsort(-scores, kind="stable")
+    else:
+        order = np.array([idx for _, idx in sort_func(_scored(scores.tolist()))], dtype=np.int64)
+    keep = _nms_keep(arr, order, iou_thr, max_keep)
+    if isinstance(boxes, np.ndarray):
+        return boxes[keep]
+    return [boxes[i] for i in keep]
+
+# 替换 nms 本身的引擎，在 run_once 中固定使用 quick 排序计时
+NMS_ENGINES: Dict[str, Callable] = {
+    "grid": nms_grid,
+}
+if np is not None:
+    NMS_ENGINES["numpy"] = nms_numpy
+
+# ---------- Soft-NMS：不直接删除重叠框，而是按 IoU 衰减其分数 ----------
+def _decay(o: float, method: str, iou_thr: float, sigma: float) -> float:
+    if method == "linear":
+        return 1-o if o > iou_thr else 1.0
+    return math.exp(-o*o/sigma)     # gaussian
+
+def soft_nms(boxes: List[Box], method: str = "linear", iou_thr: float = 0.3, sigma: float = 0.5,
+             score_thr: float = 0.001, cell: float = None) -> List[Box]:
+    # 每次取当前分数最高的框保留，并衰减与之相交的框：linear 为 s*(1-IoU)（仅 IoU > iou_thr），
+    # gaussian 为 s*exp(-IoU^2/sigma)。不相交的框衰减系数恰为 1，故只需经网格找相交的候选；
+    # 当前最高分由带惰性失效的堆给出。返回保留框（分数为衰减后的值），低于 score_thr 的丢弃
+    if method not in ("linear", "gaussian"):
+        raise ValueError(f"未知的 Soft-NMS 方法: {method}")
+    if not boxes:
+        return []
+    grid = BoxGrid(boxes, cell)
+    scores = [b[4] for b in boxes]
+    heap = [(-sc, i) for i, sc in enumerate(scores)]
+    heapq.heapify(heap)
+    done = [False]*len(boxes); keep = []; evals = 0
+    while heap:
+        sc, i = heapq.heappop(heap)
+        if done[i] or -sc != scores[i]: continue     # 分数已被衰减过的旧堆项
+        if -sc < score_thr: break                    # 分数只降不升，其余的更低
+        done[i] = True
+        b = boxes[i]; keep.append(b[:4] + (scores[i],))
+        for j in set(grid.query(b)):
+            if done[j]: continue
+            c = boxes[j]
+            if c[0] >= b[2] or c[2] <= b[0] or c[1] >= b[3] or c[3] <= b[1]: continue
+            evals += 1
+            f = _decay(iou(b, c), method, iou_thr, sigma)
+            if f != 1.0:
+                scores[j] *= f
+                heapq.heappush(heap, (-scores[j], j))
+    if PROBE.enabled:
+        PROBE.add("exp4.soft_nms.iou", evals)
+    return keep
+
+# ---------- 流式 NMS：分块输入，尽早输出已确定的检测 ----------
+class StreamingNMS:
+    # 不相交的框互不影响去留，因此 NMS / Soft-NMS 可按"相交连通分量"独立求解。
+    # 网格索引登记尚未输出的框，新框经索引找到与之相交的框，用并查集合并分量。
+    # 调用方在 push 时给出 frontier，承诺之后的框都满足 y1 >= frontier（按行扫描的分块/条带）；
+    # 分量内所有框 y2 <= frontier 时不会再与新框相交，其结果即为最终结果，立即求解并输出。
+    # 输出集合与对全部框一次性做 nms(boxes, heap_sort) / soft_nms 相同，顺序为确定的先后。
+    # 已输出分量的框与并查集项随即删除，常驻内存只与 frontier 之下尚未确定的框数成正比，可长期流式使用。
+    def __init__(self, iou_thr: float = None, method: str = "hard", cell: float = 64.0, **soft_args):
+        # method: "hard" | "linear" | "gaussian"；soft_args（sigma、score_thr）透传给 soft_nms；
+        # iou_thr 缺省时与对应的一次性函数一致：hard 取 nms 的 0.5，soft 取 soft_nms 的 0.3
+        if iou_thr is None:
+            iou_thr = 0.5 if method == "hard" else 0.3
+        self.iou_thr, self.method, self.cell, self.soft_args = iou_thr, method, cell, soft_args
+        self.boxes: Dict[int, Box] = {}             # 编号 -> 框，仅含未输出的框
+        self.parent: Dict[int, int] = {}
+        self.next_id = 0                            # 编号按到达顺序递增，不复用
+        self.members: Dict[int, List[int]] = {}     # 分量根 -> 成员编号
+        self.bottom: Dict[int, float] = {}          # 分量根 -> 成员最大 y2
+        self.pending: List[Tuple[float, int]] = []  # (bottom, 根) 小顶堆，含过期项
+        self.cells: Dict[Tuple[int, int], set] = {}
+        self.frontier = -math.inf
+
+    def _find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]; x = parent[x]
+        return x
+
+    def _union(self, a: int, b: int) -> int:
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.members[a].extend(self.members.pop(b))
+        self.bottom[a] = max(self.bottom[a], self.bottom.pop(b))
+        return a
+
+    def _span(self, b: Box):
+        c = self.cell
+        return [(gx, gy) for gx in range(math.floor(b[0]/c), math.floor(b[2]/c)+1)
+                         for gy in range(math.floor(b[1]/c), math.floor(b[3]/c)+1)]
+
+    def _insert(self, b: Box):
+        if b[1] < self.frontier:
+            raise ValueError(f"框 {b} 的 y1 小于已承诺的 frontier {self.frontier}")
+        i = self.next_id; self.next_id += 1
+        self.boxes[i] = b; self.parent[i] = i
+        self.members[i] = [i]; self.bottom[i] = b[3]
+        root = i
+        for key in self._span(b):
+            cell = self.cells.setdefault(key, set())
+            for j in cell:
+                rj = self._find(j)
+                if rj == root: continue
+                c = self.boxes[j]
+                if c[0] >= b[2] or c[2] <= b[0] or c[1] >= b[3] or c[3] <= b[1]: continue
+                root = self._union(root, rj)
+            cell.add(i)
+        heapq.heappush(self.pending, (self.bottom[root], root))
+
+    def _solve(self, ids: List[int]) -> List[Box]:
+        comp = [self.boxes[i] for i in sorted(ids)]     # 到达顺序，与一次性处理时的并列次序一致
+        if self.method == "hard":
+            return comp if len(comp) == 1 else nms_grid(comp, heap_sort, self.iou_thr)
+        return soft_nms(comp, self.method, self.iou_thr, **self.soft_args)
+
+    def _finalize(self, limit: float) -> List[Box]:
+        out = []
+        while self.pending and self.pending[0][0] <= limit:
+            bottom, r = heapq.heappop(self.pending)
+            if self.parent.get(r) != r or self.bottom.get(r) != bottom: continue     # 已被合并、扩大或输出
+            ids = self.members.pop(r); del self.bottom[r]
+            for i in ids:
+                for key in self._span(self.boxes[i]):
+                    cell = self.cells[key]; cell.discard(i)
+                    if not cell: del self.cells[key]
+            out.extend(self._solve(ids))
+            for i in ids:
+                del self.boxes[i], self.parent[i]
+        return out
+
+    def push(self, chunk: List[Box], frontier: float = None) -> List[Box]:
+        # 加入一块框；给出 frontier 时返回因此而确定的检测
+        for b in chunk:
+            self._insert(b)
+        if frontier is None:
+            return []
+        self.frontier = max(self.frontier, frontier)
+        return self._finalize(self.frontier)
+
+    def flush(self) -> List[Box]:
+        # 输入结束：剩余分量全部求解
+        return self._finalize(math.inf)
+
+def stream_nms(chunks, iou_thr: float = None, method: str = "hard", **kwargs):
+    # chunks 为 (框列表, frontier) 序列；逐个产出已确定的检测
+    engine = StreamingNMS(iou_thr, method, **kwargs)
+    for chunk, frontier in chunks:
+        yield from engine.push(chunk, frontier)
+    yield from engine.flush()
+
+def band_chunks(boxes: List[Box], band: float = 50.0):
+    # 按 y1 切成水平条带模拟逐行到达的分块，frontier 为下一条带的上沿
+    bands: Dict[int, List[Box]] = {}
+    for b in boxes:
+        bands.setdefault(math.floor(b[1]/band), []).append(b)
+    for k in sorted(bands):
+        yield bands[k], (k+1)*band
+
+# ---------- 批量 NMS：多图多类别，一行一个检测 [image_id, class_id, x1, y1, x2, y2, score] ----------
+DET_COLS = 7
+
+def _image_keep(dets, lo: int, hi: int, iou_thr: float, max_keep: int = None):
+    # 单张图 dets[lo:hi]：各类别坐标整体平移 class_id*span，不同类别的框不可能相交，
+    # 一次 NMS 即完成所有类别各自的抑制；max_keep 为整张图的保留上限
+    d = dets[lo:hi]
+    boxes = d[:, 2:6]
+    span = boxes.max() - boxes.min() + 1
+    shifted = boxes + (d[:, 1] * span)[:, None]
+    order = np.argsort(-d[:, 6], kind="stable")
+    return lo + np.asarray(_nms_keep(shifted, order, iou_thr, max_keep), dtype=np.int64)
+
+def _batched_worker(task):
+    # 挂载父进程的共享内存：读检测数组，把保留标记直接写入共享的 mask，不经 pickle 回传
+    dets_name, mask_name, n, ranges, iou_thr, max_keep = task
+    blocks = [shared_memory.SharedMemory(name=dets_name), shared_memory.SharedMemory(name=mask_name)]
+    dets = np.ndarray((n, DET_COLS), np.float64, blocks[0].buf)
+    mask = np.ndarray((n,), np.bool_, blocks[1].buf)
+    for lo, hi in ranges:
+        mask[_image_keep(dets, lo, hi, iou_thr, max_keep)] = True
+    del dets, mask      # 先释放视图，共享内存块才能关闭
+    for b in blocks:
+        b.close()
+    return len(ranges)
+
+def batched_nms(dets, iou_thr: float = 0.5, max_keep: int = None, workers: int = None,
+                pool: ProcessPoolExecutor = None, images_per_task: int = 4):
+    # dets 为 N×7 数组或元组列表；返回保留的检测（按 image_id 分组，图内按分数降序）。
+    # workers > 1 或给出 pool（可跨批次复用）时，检测数组放入共享内存，按图像分块交给进程池
+    if np is None:
+        raise ImportError("batched_nms 需要 numpy")
+    dets = np.asarray(dets, dtype=np.float64).reshape(-1, DET_COLS)
+    dets = dets[np.argsort(dets[:, 0], kind="stable")]
+    n = len(dets)
+    if not n:
+        return dets
+    cuts = (np.flatnonzero(np.diff(dets[:, 0])) + 1).tolist()
+    ranges = list(zip([0] + cuts, cuts + [n]))
+    workers = workers or os.cpu_count() or 1
+    if pool is None and (workers <= 1 or len(ranges) <= images_per_task):
+        mask = np.zeros(n, np.bool_)
+        for lo, hi in ranges:
+            mask[_image_keep(dets, lo, hi, iou_thr, max_keep)] = True
+    else:
+        blocks = [shared_memory.SharedMemory(create=True, size=dets.nbytes),
+                  shared_memory.SharedMemory(create=True, size=n)]
+        try:
+            np.ndarray(dets.shape, np.float64, blocks[0].buf)[:] = dets
+            np.ndarray((n,), np.bool_, blocks[1].buf)[:] = False
+            tasks = [(blocks[0].name, blocks[1].name, n, ranges[k:k+images_per_task], iou_thr, max_keep)
+                     for k in range(0, len(ranges), images_per_task)]
+            if pool is None:
+                with ProcessPoolExecutor(max_workers=workers) as p:
+                    list(p.map(_batched_worker, tasks))
+            else:
+                list(pool.map(_batched_worker, tasks))
+            mask = np.ndarray((n,), np.bool_, blocks[1].buf).copy()
+        finally:
+            for b in blocks:
+                b.close(); b.unlink()
+    kept = dets[mask]
+    return kept[np.lexsort((-kept[:, 6], kept[:, 0]))]
+
+def random_detections(batch: int, n: int, num_classes: int = 20, seed: int = 0, size=500):
+    # 模拟检测器输出：每张图 n//10 个目标（类别随机），每个检测是某个目标框加 ±6 像素抖动
+    rng = random.Random(seed)
+    rows = []
+    for img in range(batch):
+        objs = []
+        for _ in range(max(1, n // 10)):
+            x1, y1 = rng.randint(0, size-80), rng.randint(0, size-80)
+            objs.append((rng.randrange(num_classes), x1, y1, x1+rng.randint(20, 80), y1+rng.randint(20, 80)))
+        for _ in range(n):
+            c, x1, y1, x2, y2 = rng.choice(objs)
+            j = [rng.randint(-6, 6) for _ in range(4)]
+            rows.append((img, c, x1+j[0], y1+j[1], x2+j[2], y2+j[3], rng.random()))
+    return np.array(rows, dtype=np.float64).reshape(-1, DET_COLS)
+
+def bench_batched(batch_sizes=(1, 2, 4, 8, 16, 32, 64, 128, 256), n=500, num_classes=20):
+    # 每帧 n 个检测、num_classes 个类别；串行与进程池（跨批次复用）两种执行方式的帧率
+    workers = os.cpu_count() or 1
+    print(f"----------- 批量 NMS 帧率（每帧 {n} 框，{num_classes} 类，{workers} 进程） -----------")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for b in batch_sizes:
+            dets = random_detections(b, n, num_classes, seed=b)
+            t0 = time.perf_counter(); serial = batched_nms(dets, workers=1); t1 = time.perf_counter()
+            pooled = batched_nms(dets, pool=pool); t2 = time.perf_counter()
+            assert np.array_equal(serial, pooled)
+            print(f"batch={b:4}  串行 {b/(t1-t0):8.1f} FPS  进程池 {b/(t2-t1):8.1f} FPS  保留 {len(serial)/b:.1f} 框/帧")
+
+def bench_stream(n=5000, size=2000, band=50.0, seed: int = None):
+    # 条带流式 vs 一次性：总耗时、首个检测的输出延迟；Soft-NMS 走网格索引。
+    # 画面过密时全部框连成一个分量，只能在结束时输出，故默认用 size×size 的较大画面
+    boxes = random_boxes(n, size, rng=random.Random(SEED if seed is None else seed))
+    print(f"----------- 流式 NMS / Soft-NMS（n={n}，画面 {size}，条带高 {band}） -----------")
+    t0 = time.perf_counter(); ref = nms_grid(boxes, heap_sort); t1 = time.perf_counter()
+    print(f"一次性 nms_grid: {(t1-t0)*1000:8.1f}ms  保留 {len(ref)}")
+    soft = {}
+    for method in ("hard", "linear", "gaussian"):
+        t0 = time.perf_counter(); first = None; out = []
+        for b in stream_nms(band_chunks(boxes, band), method=method):
+            if first is None: first = time.perf_counter()-t0
+            out.append(b)
+        t = time.perf_counter()-t0
+        print(f"流式 {method:>8}: {t*1000:8.1f}ms  首个输出 {first*1000:7.1f}ms  保留 {len(out)}")
+        if method == "hard":
+            assert sorted(out) == sorted(ref)
+        else:
+            soft[method] = out
+    for method in ("linear", "gaussian"):
+        t0 = time.perf_counter(); out = soft_nms(boxes, method); t = time.perf_counter()-t0
+        print(f"一次性 soft_nms {method:>8}: {t*1000:8.1f}ms  保留 {len(out)}")
+        assert sorted(out) == sorted(soft[method])
+
 SIZES = [100, 500, 1000, 2000, 5000, 10000]
 DIST  = ["random", "cluster"]
 REPEAT = 5
+WARMUP = 1
+SEED = 2024
 
-def run_once(n, dist):
+def make_boxes(n: int, dist: str, seed: int = SEED) -> List[Box]:
+    # 数据集只由 (seed, dist, n) 决定，各次运行、各算法看到的框完全相同
     gen = random_boxes if dist == "random" else cluster_boxes
-    boxes = gen(n)
-    times = {}
-    for name, fn in SORT_DICT.items():
+    return gen(n, rng=random.Random(f"{seed}-{dist}-{n}"))
+
+def algorithms() -> Dict[str, Callable]:
+    # 名称 -> fn(boxes)：各排序接入 nms，各引擎固定用 quick 排序
+    algos = {name: (lambda b, fn=fn, k=SORT_MAX_KEEP.get(name): nms(b, fn, max_keep=k))
+             for name, fn in SORT_DICT.items()}
+    algos.update({name: (lambda b, e=engine: e(b, quick_sort)) for name, engine in NMS_ENGINES.items()})
+    return algos
+
+def measure(fn: Callable, boxes: List[Box], repeat: int = REPEAT, warmup: int = WARMUP) -> Dict[str, float]:
+    # 先预热，再计时 repeat 次取中位数/四分位距/最小值；峰值内存单独跑一次（tracemalloc 会拖慢计时）
+    for _ in range(warmup):
+        fn(boxes)
+    times = []
+    for _ in range(repeat):
         t0 = time.perf_counter()
-        nms(boxes, fn)
-        t1 = time.perf_counter()
-        times[name] = (t1-t0)*1000
-    return times
-
-def main():
-    csv_path = "results.csv"
-    with open(csv_path, "w", newline='', encoding='utf-8') as f:
+        fn(boxes)
+        times.append((time.perf_counter()-t0)*1000)
+    q1, med, q3 = statistics.quantiles(times, n=4, method="inclusive") if len(times) > 1 else times*3
+    tracemalloc.start()
+    fn(boxes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"median_ms": med, "iqr_ms": q3-q1, "min_ms": min(times), "peak_kb": peak/1024}
+
+def run_once(n, dist, algos: List[str] = None, repeat: int = REPEAT, warmup: int = WARMUP, seed: int = SEED):
+    # 返回 {算法: 统计}；同时校验各引擎与 quick 排序下 nms 的输出一致
+    table = algorithms()
+    boxes = make_boxes(n, dist, seed)
+    ref = table["quick"](boxes) if any(a in NMS_ENGINES for a in algos or table) else None
+    stats = {}
+    for name in algos or table:
+        if name in NMS_ENGINES:
+            assert table[name](boxes) == ref, f"{name} 与 nms 结果不一致"
+        stats[name] = measure(table[name], boxes, repeat, warmup)
+        if PROBE.enabled:   # 开启插桩时另跑一次，记录单次调用的计数增量
+            before = PROBE.snapshot()
+            table[name](boxes)
+            stats[name]["counters"] = {k: v-before.get(k, 0) for k, v in PROBE.counters.items()
+                                       if v != before.get(k, 0)}
+    return stats
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    # 中位数比基线慢 tolerance 以上且超出基线的四分位距，记为回归
+    base = {(r["dist"], r["n"], r["algo"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["dist"], r["n"], r["algo"]))
+        if b and r["median_ms"] > b["median_ms"]*(1+tolerance) + b["iqr_ms"]:
+            regressions.append(f"{r['dist']:>7} n={r['n']:5} {r['algo']:>7}: "
+                               f"{b['median_ms']:.2f}ms -> {r['median_ms']:.2f}ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NMS 排序/引擎基准测试")
+    parser.add_argument("mode", nargs="?", choices=["nms", "batched", "stream"], default="nms")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--dists", nargs="+", choices=DIST, default=DIST)
+    parser.add_argument("--algos", nargs="+", choices=list(algorithms()), default=None)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", default="results.json", help="结果文件（可作为之后运行的基线）")
+    parser.add_argument("--csv", default="results.csv")
+    parser.add_argument("--baseline", help="与之比较的基线 JSON，发现回归时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+    if args.mode == "batched":
+        bench_batched()
+        return 0
+    if args.mode == "stream":
+        bench_stream(seed=args.seed)
+        return 0
+
+    results = []
+    for dist in args.dists:
+        print(f"[{dist} distribution]")
+        for n in args.sizes:
+            for algo, st in run_once(n, dist, args.algos, args.repeat, args.warmup, args.seed).items():
+                results.append({"dist": dist, "n": n, "algo": algo, **st})
+                print(f"n={n:5} {algo:>7}  median {st['median_ms']:9.2f}ms  IQR {st['iqr_ms']:7.2f}ms  "
+                      f"min {st['min_ms']:9.2f}ms  peak {st['peak_kb']:9.1f}KB")
+
+    meta = {"seed": args.seed, "repeat": args.repeat, "warmup": args.warmup,
+            "python": sys.version.split()[0], "numpy": np.__version__ if np is not None else None}
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1, sort_keys=True)
+        f.write("\n")
+    fields = ["dist", "n", "algo", "median_ms", "iqr_ms", "min_ms", "peak_kb"]
+    with open(args.csv, "w", newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(["dist", "n", "quick", "merge", "heap", "shell"])
-        # 控制台表格
-        print("----------- 不同排序算法在 NMS 中的性能对比（n=5000） -----------")
-        base_line = {}
-        for dist in DIST:
-            print(f"[{dist} distribution]")
-            for n in [5000]:
-                t = run_once(n, dist)
-                if dist == "random":
-                    base_line = t
-                print(f"n={n:5}  " + "  ".join(f"{k:>7}:{v:7.2f}ms" for k, v in t.items()))
-        print("\n相对 quick (random) 的比值：")
-        for k in SORT_DICT:
-            print(f"{k:>7}: {base_line[k]/base_line['quick']:.2f}x")
-
-        print("\n----------- 数据规模对性能的影响（random） -----------")
-        for n in SIZES:
-            t = run_once(n, "random")
-            print(f"n={n:5}  " + "  ".join(f"{k:>7}:{v:7.2f}ms" for k, v in t.items()))
-            writer.writerow(["random", n] + [t[k] for k in SORT_DICT])
-
-        print("\n----------- 数据分布对性能的影响（n=5000） -----------")
-        for dist in DIST:
-            t = run_once(5000, dist)
-            print(f"{dist:>7}  " + "  ".join(f"{k:>7}:{v:7.2f}ms" for k, v in t.items()))
-            writer.writerow([dist, 5000] + [t[k] for k in SORT_DICT])
-
-    print(f"\n原始数据已写入 {os.path.abspath(csv_path)}")
+        writer.writerow(fields)
+        writer.writerows([r[k] for k in fields] for r in results)
+    print(f"\n原始数据已写入 {os.path.abspath(args.json)} / {os.path.abspath(args.csv)}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["seed"] != args.seed:
+            print("警告：基线使用了不同的随机种子，数据集不同")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        print(f"\n相对基线 {args.baseline}：" + (f"{len(regressions)} 项回归" if regressions else "无回归"))
+        for line in regressions:
+            print("  " + line)
+        return 1 if regressions else 0
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
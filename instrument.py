@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+instrument.py
+各实验共用的轻量插桩层：按名字累计计数器（比较/交换次数、IoU 计算、松弛、堆操作、token 数）
+与计时器，运行时可随时开关，导出为 JSON。
+关闭时热点路径只在每次调用入口读一次 PROBE.enabled，循环内用局部变量计数并在出口一次性累加，
+或由循环结束时的下标直接推出次数，因此几乎没有额外开销。
+C 实现内部的比较（sorted/heapq）在开启时改用 counting() 返回的包装键观测，关闭时不包装。
+环境变量 INSTRUMENT=1 在导入时开启并于退出时把结果写到 stderr；INSTRUMENT=<路径> 则写入该文件。
+计数器按进程独立，进程池子进程中的计数不会汇总回主进程。
+"""
+import atexit
+import json
+import operator
+import os
+import sys
+import time
+from collections import Counter
+
+class _Timer:
+    __slots__ = ("probe", "name", "t0")
+    def __init__(self, probe, name):
+        self.probe, self.name = probe, name
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        rec = self.probe.timers.setdefault(self.name, [0, 0.0])
+        rec[0] += 1
+        rec[1] += time.perf_counter() - self.t0
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Probe:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = Counter()
+        self.timers = {}        # 名字 -> [调用次数, 累计秒数]
+        self._key_types = {}
+    def enable(self):
+        self.enabled = True
+    def disable(self):
+        self.enabled = False
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+    def add(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+    def timer(self, name):
+        # with PROBE.timer("x"): ...；关闭时返回共享的空上下文
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+    def counting(self, name):
+        # 返回包装类 K：K(v) 之间（或与裸值）的每次比较计入 name，取负仍得 K，原值在 .v
+        cls = self._key_types.get(name)
+        if cls is not None:
+            return cls
+        counters = self.counters
+        def cmp(op):
+            def f(a, b):
+                counters[name] += 1
+                return op(a.v, b.v if type(b) is cls else b)
+            return f
+        def init(self, v):
+            self.v = v
+        ns = {"__slots__": ("v",), "__init__": init, "__hash__": None,
+              "__neg__": lambda a: cls(-a.v), "__float__": lambda a: float(a.v),
+              "__repr__": lambda a: repr(a.v)}
+        for op in ("lt", "le", "gt", "ge", "eq", "ne"):
+            ns[f"__{op}__"] = cmp(getattr(operator, op))
+        cls = self._key_types[name] = type("Counted", (), ns)
+        return cls
+    def snapshot(self):
+        return dict(self.counters)
+    def export(self):
+        return {"enabled": self.enabled,
+                "pid": os.getpid(),
+                "counters": dict(sorted(self.counters.items())),
+                "timers": {k: {"calls": c, "seconds": s} for k, (c, s) in sorted(self.timers.items())}}
+    def dump(self, path=None):
+        # path 为 None 时写到 stderr
+        text = json.dumps(self.export(), ensure_ascii=False, indent=2)
+        if path is None:
+            print(text, file=sys.stderr)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+PROBE = Probe()
+enable, disable, reset, add, timer, counting, export, dump = (
+    PROBE.enable, PROBE.disable, PROBE.reset, PROBE.add,
+    PROBE.timer, PROBE.counting, PROBE.export, PROBE.dump)
+
+_env = os.environ.get("INSTRUMENT", "")
+if _env and _env != "0":
+    PROBE.enable()
+    atexit.register(PROBE.dump, None if _env == "1" else _env)